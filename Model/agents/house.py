@@ -1,6 +1,7 @@
 # House agent skeleton code.
 # from agents.realtor import Realtor
 from mesa import Agent
+from environment.slot_arrays import SlotField
 import numpy as np
 import random
 
@@ -45,12 +46,15 @@ class House(Agent):
     offer_date: Date when the house was offered.
     end_of_life: Date when the house reaches the end of its life cycle.
     occupied (bool): Indicates if the house is occupied.
+    state (HouseState): The model's arrays holding the quality, for_sale,
+        sale_price, date_for_sale and end_of_life attributes of the houses.
+    slot (int): The house's slot in those arrays.
 
     Methods:
     step():
         Perform a step in the simulation for the house.
 
-    demolish(agents_list):
+    demolish():
         Demolish the house and handle related references.
 
     get_house_ID():
@@ -86,6 +90,9 @@ class House(Agent):
     set_for_sale(decision):
         Set whether the house is for sale or not.
 
+    update_local_realtors():
+        Tell the local realtors whether the house is for sale.
+
     get_end_of_life():
         Get the end-of-life date for the house.
 
@@ -110,7 +117,7 @@ class House(Agent):
     get_for_sale():
         Check if the house is for sale.
 
-    set_realtor_valuation(list_of_houses):
+    set_realtor_valuation():
         Set the realtor associated with the house based on valuation.
 
     set_realtor():
@@ -123,8 +130,15 @@ class House(Agent):
         Calculate the price difference between this house and another house.
     """
 
+    # the house's state lives in the model's HouseState arrays.
+    quality = SlotField("state", "quality")
+    date_for_sale = SlotField("state", "date_for_sale")
+    end_of_life = SlotField("state", "end_of_life")
+
     def __init__(self, house_id, model):
         super().__init__(house_id, model)
+        self.state = model.house_state
+        self.slot = self.state.allocate()
         self.house_id = house_id  # Each House object has a unique ID.
         self.agent_type = "House"
         self.my_owner = None
@@ -142,7 +156,24 @@ class House(Agent):
     def step(self):
         "IMPORTANT! The agents step goes here! What does it do?"
 
-    def demolish(self, agents_list):
+    # the price of a house for sale drops every tick, see HouseState.
+    @property
+    def sale_price(self):
+        return self.state.price_of(self.slot)
+
+    @sale_price.setter
+    def sale_price(self, new_price):
+        self.state.set_price(self.slot, new_price)
+
+    @property
+    def for_sale(self):
+        return bool(self.state.for_sale[self.slot])
+
+    @for_sale.setter
+    def for_sale(self, decision):
+        self.state.set_for_sale(self.slot, decision)
+
+    def demolish(self):
         """
         ;; delete the house, but make sure all references to it are dealt with
         ; if anyone lives here, make them homeless
@@ -175,10 +206,9 @@ class House(Agent):
             owner.set_repayment(0)
 
         # ; if this house is on a realtor's record, remove the record
-        for realtors in agents_list:
-            if realtors.agent_type == "Realtor":
-                if self in realtors.get_realtor_houses():
-                    realtors.unfile_record(self)
+        self.model.sales_ledger.unfile_house(self.get_house_ID())
+        for realtor in self.local_realtors:
+            realtor.remove_house(self)
 
     def get_house_ID(self):
         return self.house_id
@@ -199,11 +229,14 @@ class House(Agent):
 
     def set_offered_to(self, owner):
         self.offered_to = owner
+        self.model.registry.update(self)
 
     # show that this house is for sale.
     def put_on_market(self, step):
         self.for_sale = True
         self.date_for_sale = step
+        self.model.registry.update(self)
+        self.update_local_realtors()
 
     def is_house_for_sale(self):
         return self.for_sale
@@ -216,12 +249,23 @@ class House(Agent):
 
     def set_for_sale(self, decision):
         self.for_sale = decision
+        self.model.registry.update(self)
+        self.update_local_realtors()
+
+    def update_local_realtors(self):
+        # the local realtors keep track of the houses for sale in their territory.
+        for realtor in self.local_realtors:
+            if self.for_sale:
+                realtor.add_house(self)
+            else:
+                realtor.remove_house(self)
 
     def get_end_of_life(self):
         return self.end_of_life
 
     def set_owner(self, owner):
         self.my_owner = owner
+        self.model.registry.update(self)
 
     def get_owner(self):
         return self.my_owner
@@ -234,6 +278,7 @@ class House(Agent):
 
     def set_quality_index(self, quality_index):
         self.quality = quality_index
+        self.model.registry.update(self)
 
     def get_quality(self):
         return self.quality
@@ -241,11 +286,11 @@ class House(Agent):
     def get_for_sale(self):
         return self.for_sale
 
-    def set_realtor_valuation(self, list_of_houses):
+    def set_realtor_valuation(self):
         valuations = {}
         # set my-realtor max-one-of local-realtors [ valuation myself ]
         for realtor in self.get_list_of_local_realtors():
-            valuations[realtor] = realtor.valuation(self, list_of_houses)
+            valuations[realtor] = realtor.valuation(self)
 
         maximum_val = max(valuations.values())
         maximum_keys = [k for k, v in valuations.items() if v == maximum_val]
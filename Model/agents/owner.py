@@ -1,10 +1,10 @@
 from mesa import Agent
 
 # from input_params import InputParameters
-from agents.records import Records
 import numpy as np
-import random
 from operator import attrgetter
+from environment.slot_arrays import SlotField
+from environment.income_sampler import sample_incomes
 
 """The Owner object
 Date edited: 08/02/2022
@@ -43,19 +43,24 @@ class Owner(Agent):
     date_of_purchase: Date when the owner purchased the house.
     made_offer_on: House the owner has made an offer on.
     homeless (int): Indicator for the owner being homeless.
+    finance (OwnerFinance): The model's arrays holding the income, mortgage,
+        repayment, capital and homeless attributes of the owners.
+    slot (int): The owner's slot in those arrays.
 
     Methods:
     step():
         Perform a step in the simulation for the owner agent.
 
-    assign_income(current_timestep):
-        Assign income to the owner based on simulation parameters.
+    assign_income(current_timestep, income=None):
+        Assign income to the owner based on simulation parameters, or the income
+        given.
 
     make_offer(houses_for_sale, ticks):
         Make an offer on a suitable property for purchase.
 
-    move_house(model, ticks, record_id):
-        Move to the house the owner is buying and handle related transactions.
+    move_house(model, ticks):
+        Move to the house the owner is buying and handle related transactions,
+        the seller moves next.
 
     follow_chain():
         Find the end of the chain which has the owner's house as a link.
@@ -112,8 +117,14 @@ class Owner(Agent):
         Calculate stamp duty land tax based on the cost of a property.
     """
 
+    # the owner's finances live in the model's OwnerFinance arrays.
+    capital = SlotField("finance", "capital")
+    homeless = SlotField("finance", "homeless")
+
     def __init__(self, owner_id, my_house, model):
         super().__init__(owner_id, model)
+        self.finance = model.owner_finance
+        self.slot = self.finance.allocate()
         self.owner_id = owner_id
         self.my_house = my_house
         self.agent_type = "Owner"
@@ -129,22 +140,45 @@ class Owner(Agent):
     def step(self):
         "Step function for the owner agent, what does it do when it is activated?"
 
-    def assign_income(self, current_timestep):
-        ALPHA = 1.3  # shape parameter
-        LAMBDA = 1 / 20000  # scale parameter
-        MEANINCOME = self.model.MeanIncome
-        INFLATION = self.model.Inflation
-        TICKSPERYEAR = self.model.TicksPerYear
-        SAVINGS = self.model.Savings
-
-        while self.income < MEANINCOME / 2:
-            self.set_income(
-                (MEANINCOME * LAMBDA / ALPHA)
-                * (np.random.gamma(shape=ALPHA, scale=ALPHA / LAMBDA))
-                * (1 + (INFLATION / (TICKSPERYEAR * 100))) ** current_timestep
-            )
-
-        self.set_capital(self.income * SAVINGS / 100)
+    # inflation and mortgage repayments are worked out when read, see OwnerFinance.
+    @property
+    def income(self):
+        return self.finance.income_of(self.slot)
+
+    @income.setter
+    def income(self, new_income):
+        self.finance.set_income(self.slot, new_income)
+
+    @property
+    def mortgage(self):
+        return self.finance.mortgage_of(self.slot)
+
+    @mortgage.setter
+    def mortgage(self, new_mortgage):
+        self.finance.set_mortgage(self.slot, new_mortgage)
+
+    @property
+    def repayment(self):
+        return self.finance.repayment_of(self.slot)
+
+    @repayment.setter
+    def repayment(self, new_repayment):
+        self.finance.set_repayment(self.slot, new_repayment)
+
+    def assign_income(self, current_timestep, income=None):
+        # the income is drawn here unless it has been drawn with other owners'
+        # incomes, see sample_incomes().
+        if income == None:
+            income = sample_incomes(
+                1,
+                self.model.MeanIncome,
+                self.model.Inflation,
+                self.model.TicksPerYear,
+                current_timestep,
+            )[0]
+        self.set_income(float(income))
+
+        self.set_capital(self.income * self.model.Savings / 100)
 
     def make_offer(self, houses_for_sale, ticks):
         """
@@ -196,23 +230,13 @@ class Owner(Agent):
 
         lowerbound = upperbound * 0.7
         current_house = self.get_my_house()
-        interesting_house = [
-            i
-            for i in houses_for_sale
-            if (not i.get_offered_to())
-            and (i.get_sale_price() <= upperbound)
-            and (i.get_sale_price() > lowerbound)
-            and (i != current_house)
-        ]
-
         """
         ; if there are more interesting houses than the buyer's search length,
         ;   select that number at random
         """
-        if len(interesting_house) > self.model.BuyerSearchLength:
-            interesting_house = random.sample(
-                interesting_house, self.model.BuyerSearchLength
-            )
+        interesting_house = houses_for_sale.sample_band(
+            lowerbound, upperbound, self.model.BuyerSearchLength, current_house
+        )
 
         if len(interesting_house) > 0:
             # ;select the best that has not already had an offer on it
@@ -221,13 +245,16 @@ class Owner(Agent):
             if property != None:
                 property.set_offered_to(self)
                 property.set_offer_date(ticks)
+                houses_for_sale.remove(property)
 
                 self.made_offer_on = property
 
-    def move_house(self, model, ticks, record_id):
+    def move_house(self, model, ticks):
         """
         ;; move me to the house I am buying
         ;; then move the seller to their new house etc.
+
+        Only this owner is moved; the model moves the rest of the chain in turn.
         """
         new_house = self.get_made_offer()
 
@@ -305,15 +332,12 @@ class Owner(Agent):
         self.set_made_offer_on(None)
 
         # ;; update realtor's history with this sale price
-        record = Records(record_id, new_house, new_house.get_sale_price(), ticks, model)
-        model.schedule.add(record)
-        new_house.get_my_realtor().file_record(record)
+        new_house.get_my_realtor().file_record(
+            new_house, new_house.get_sale_price(), ticks
+        )
 
         model.moves += 1
 
-        if seller != None:
-            seller.move_house(model, ticks, model.get_new_id())
-
     def follow_chain(self):
         """
         ;; Find the end of the chain which has my house as a link:
@@ -323,18 +347,24 @@ class Owner(Agent):
         ;; continue until the seller of that house is the first buyer.
         ;;   This is a successful chain; Stop
         """
-        if self.get_made_offer() == None:
-            return False
+        # walked link by link, rather than recursively, so any length of chain is safe.
+        link = self
+        on_chain = {self}
+        while True:
+            if link.get_made_offer() == None:
+                return False
 
-        seller = self.get_made_offer().get_owner()
+            seller = link.get_made_offer().get_owner()
 
-        if seller == None:
-            return True
+            if seller == None:
+                return True
 
-        if self == seller:
-            return True
+            if seller in on_chain:
+                # the chain has come back round: it only completes if it is at my house.
+                return seller == self
 
-        return seller.follow_chain()
+            on_chain.add(seller)
+            link = seller
 
     def get_made_offer(self):
         return self.made_offer_on
@@ -374,6 +404,7 @@ class Owner(Agent):
 
     def set_my_house(self, house):
         self.my_house = house
+        self.model.registry.update(self)
 
     def get_owner_id(self):
         return self.owner_id
@@ -1,7 +1,7 @@
 # Person agent skeleton code.
 from mesa import Agent
 import numpy as np
-from math import sqrt
+from math import ceil, sqrt
 
 # np.random.seed(0)
 
@@ -12,7 +12,7 @@ Email: solmez@turing.ac.uk
 
 Parameters:
     company - the organisation that owns this realtor.
-    my_houses - the houses in this realtor's terroritory.
+    my_houses - the houses for sale in this realtor's terroritory.
     sales - the last few house sales that was made by this realtor.
     average_price - the average price of a house in the realtor's territory.
 """
@@ -31,8 +31,8 @@ class Realtor(Agent):
     realtor_id (int): Unique identifier for the realtor.
     agent_type (str): Type of agent, set to "Realtor".
     company: The real estate company the realtor is associated with.
-    my_houses (list): List of houses associated with the realtor.
-    sales (list): List of sales records made by the realtor.
+    my_houses (set): The houses for sale in the realtor's territory.
+    sales (SalesLedger): The model's sales ledger, holding the records filed with the realtor.
     average_price (float): Average sale price of the realtor's houses.
 
     Methods:
@@ -46,7 +46,13 @@ class Realtor(Agent):
         Get the real estate company associated with the realtor.
 
     get_realtor_houses():
-        Get the list of houses associated with the realtor.
+        Get the houses for sale in the realtor's territory.
+
+    add_house(house):
+        Note that a house in the realtor's territory has been put up for sale.
+
+    remove_house(house):
+        Note that a house in the realtor's territory is no longer for sale.
 
     get_realtor_sales():
         Get the list of sales records made by the realtor.
@@ -57,11 +63,12 @@ class Realtor(Agent):
     get_realtor_average_price():
         Get the average sale price of the realtor's houses.
 
-    set_realtor_average_price(houses):
-        Set the average sale price of the realtor's houses.
+    set_realtor_average_price(houses=None):
+        Set the average sale price to the median price of the given houses in the
+        realtor's territory, by default of the houses for sale in it.
 
-    file_record(record):
-        Add a sales record to the realtor's sales list.
+    file_record(house, selling_price, date):
+        Record the sale of a house in the sales ledger, filed with this realtor.
 
     unfile_record(house):
         Remove sales records associated with a specific house.
@@ -72,9 +79,15 @@ class Realtor(Agent):
     move():
         Move the realtor to a new position.
 
-    valuation(property, houses):
+    valuation(property):
         Calculate the valuation of a property based on local sales records.
 
+    local_sales_median(pos):
+        Get the median price of the realtor's sales near pos, None if there are none.
+
+    local_houses_median():
+        Get the median price of the houses near the realtor, None if there are none.
+
     stamp_duty_land_tax(cost):
         Calculate stamp duty land tax based on the cost of a property.
 
@@ -88,8 +101,8 @@ class Realtor(Agent):
         self.realtor_id = realtor_id
         self.agent_type = "Realtor"
         self.company = company
-        self.my_houses = []
-        self.sales = []
+        self.my_houses = set()
+        self.sales = model.sales_ledger
         self.average_price = 0
 
     def step(self):
@@ -104,24 +117,31 @@ class Realtor(Agent):
     def get_realtor_houses(self):
         return self.my_houses
 
+    def add_house(self, house):
+        self.my_houses.add(house)
+
+    def remove_house(self, house):
+        self.my_houses.discard(house)
+
     def get_realtor_sales(self):
-        return self.sales
+        return self.sales.records(self.realtor_id)
 
     def remove_sales_from_list(self, sale):
-        self.sales.remove(sale)
+        self.sales.unfile_row(sale.get_record_ID())
 
     def get_realtor_average_price(self):
         return self.average_price
 
-    def set_realtor_average_price(self, houses):
-        sale_prices_of_my_houses = []
-
-        for house in houses:
-            if self in house.get_list_of_local_realtors():
-                self.my_houses.append(house)
+    def set_realtor_average_price(self, houses=None):
+        # read once a tick, after the tick's sales and new listings: one selection
+        # pass over the prices of the houses in the territory, rather than keeping
+        # them in price order through every listing, repricing and sale.
+        if houses == None:
+            houses = self.my_houses
+        else:
+            houses = [i for i in houses if self in i.get_list_of_local_realtors()]
 
-        for houses in self.my_houses:
-            sale_prices_of_my_houses.append(houses.get_sale_price())
+        sale_prices_of_my_houses = [house.get_sale_price() for house in houses]
 
         self.average_price = np.median(sale_prices_of_my_houses)
 
@@ -129,17 +149,16 @@ class Realtor(Agent):
     #   ; push this sales record onto the list of those I keep
     #   set sales fput the-record sales
     # end
-    def file_record(self, record):
-        self.sales.append(record)
+    def file_record(self, house, selling_price, date):
+        row = self.sales.file(house, selling_price, date, self.realtor_id)
+        return self.sales.record(row)
 
     # ; delete any record that mentions the house
     def unfile_record(self, house):
-        for records_ in self.get_records():
-            if records_.get_record_house() == house:
-                self.sales.remove(records_)
+        self.sales.unfile_house(house.get_house_ID(), self.realtor_id)
 
     def get_records(self):
-        return self.sales
+        return self.get_realtor_sales()
 
     def move(self):
         possible_steps = self.model.grid.get_neighborhood(
@@ -148,7 +167,7 @@ class Realtor(Agent):
         new_position = self.random.choice(possible_steps)
         self.model.grid.move_agent(self, new_position)
 
-    def valuation(self, property, houses):
+    def valuation(self, property):
         """
         ;; A realtor values a property by looking in its records for sales
         ;; that it has made of houses in the locality to use as a guide to the
@@ -162,41 +181,26 @@ class Realtor(Agent):
         ;;  median price of all the sale prices of local houses, or if there are
         ;;  none of those either, on the avergae price of all houses in the
         ;;  realtor's territory.
+
+        The valuation, and the medians it is based on, are remembered for the rest
+        of the tick by the model's ValuationCache.
         """
-        multiplier = property.get_quality() * (1 + self.model.RealtorOptimism / 100) * 1
-        local_sales = []
+        cache = self.model.valuation_cache
+        return cache.valuation(self, property, lambda: self._valuation(property))
 
-        for records in self.get_records():
-            if records.get_record_house().pos != None and (
-                int(self.calc_distance(property.pos, records.get_record_house().pos))
-                < self.model.Locality
-            ):
-                local_sales.append(records)
+    def _valuation(self, property):
+        cache = self.model.valuation_cache
+        multiplier = property.get_quality() * (1 + self.model.RealtorOptimism / 100) * 1
 
         old_price = property.get_sale_price()
 
-        new_price = 0
-
-        if len(local_sales) > 0:
-            sale_prices = []
-            for sales in local_sales:
-                sale_prices.append(sales.get_record_selling_price())
-
-            new_price = np.median(sale_prices)
-        else:
-            local_houses = [
-                i
-                for i in houses
-                if self.calc_distance(i.pos, self.pos) <= self.model.Locality
-            ]
-            sale_prices_n = []
-            for local_h in local_houses:
-                sale_prices_n.append(local_h.get_sale_price())
-
-            if len(local_houses) > 0:
-                new_price = np.median(sale_prices_n)
-            else:
-                new_price = self.get_realtor_average_price()
+        new_price = cache.local_sales_median(
+            self, property.pos, lambda: self.local_sales_median(property.pos)
+        )
+        if new_price == None:
+            new_price = cache.local_houses_median(self, self.local_houses_median)
+        if new_price == None:
+            new_price = self.get_realtor_average_price()
 
         # ; if this is a new valuation, return it
         if old_price < 5000:
@@ -213,6 +217,24 @@ class Realtor(Agent):
 
         return multiplier * new_price
 
+    def local_sales_median(self, pos):
+        # int(distance) < Locality, i.e. distance < ceil(Locality)
+        local_sales = self.sales.local_prices(
+            self.realtor_id, pos, ceil(self.model.Locality)
+        )
+        if len(local_sales) > 0:
+            return np.median(local_sales)
+        return None
+
+    def local_houses_median(self):
+        local_houses = self.model.house_index.within(
+            self.pos, self.model.Locality, inclusive=True
+        )
+        if len(local_houses) > 0:
+            state = self.model.house_state
+            return np.median(state.prices_of(state.slots_of(local_houses)))
+        return None
+
     def stamp_duty_land_tax(self, cost):
         if self.model.StampDuty:
             if cost > 500000:
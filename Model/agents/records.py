@@ -1,7 +1,3 @@
-from input_params import InputParameters
-from mesa import Agent
-
-
 """The Record object
 Date edited: 08/02/2022
 Author: Sedar Olmez
@@ -14,54 +10,66 @@ Parameters:
 """
 
 
-class Records(Agent):
+class Records:
     """
-    A class representing a record of a house sale in a housing simulation.
+    A class giving access to one record of a house sale in a housing simulation.
+    Records are no longer agents: the sales are held as rows of the model's
+    SalesLedger and a Records object reads the columns of one row.
 
     Parameters:
-    record_id (int): Unique identifier for the record.
-    the_house: The house associated with the record.
-    selling_price (float): Selling price of the house in the record.
-    date: Date when the sale occurred.
-    model: The simulation model this record is part of.
+    ledger: The SalesLedger holding the record.
+    row (int): The row of the record in the ledger.
 
     Attributes:
-    record_id (int): Unique identifier for the record.
-    agent_type (str): Type of agent, set to "Record".
-    the_house: The house associated with the record.
-    selling_price (float): Selling price of the house in the record.
-    date: Date when the sale occurred.
+    record_id (int): Unique identifier for the record, its row in the ledger.
+    agent_type (str): Type of record, set to "Record".
 
     Methods:
     get_record_ID():
         Get the unique identifier of the record.
 
     get_record_house():
-        Get the house associated with the record.
+        Get the house associated with the record, None if it has been demolished.
 
     get_record_selling_price():
         Get the selling price of the house in the record.
 
     get_record_date():
         Get the date when the sale occurred.
+
+    get_record_realtor_ID():
+        Get the ID of the realtor the record is filed with, -1 if unfiled.
     """
 
-    def __init__(self, record_id, the_house, selling_price, date, model):
-        super().__init__(record_id, model)
-        self.record_id = record_id
+    def __init__(self, ledger, row):
+        self.ledger = ledger
+        self.record_id = row
         self.agent_type = "Record"
-        self.the_house = the_house
-        self.selling_price = selling_price
-        self.date = date
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Records)
+            and other.ledger is self.ledger
+            and other.record_id == self.record_id
+        )
+
+    def __hash__(self):
+        return hash(self.record_id)
+
+    def _slot(self):
+        return self.ledger.slot_of(self.record_id)
 
     def get_record_ID(self):
         return self.record_id
 
     def get_record_house(self):
-        return self.the_house
+        return self.ledger.resolve_house(int(self.ledger.house_id[self._slot()]))
 
     def get_record_selling_price(self):
-        return self.selling_price
+        return float(self.ledger.price[self._slot()])
 
     def get_record_date(self):
-        return self.date
+        return int(self.ledger.tick[self._slot()])
+
+    def get_record_realtor_ID(self):
+        return int(self.ledger.realtor_id[self._slot()])
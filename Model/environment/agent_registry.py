@@ -0,0 +1,195 @@
+"""The AgentRegistry object
+Description:
+    Live, typed indexes of the agents held by the model's scheduler. Rather than
+    scanning every agent in the schedule and filtering on agent_type, the model
+    asks the registry for the owners, houses or realtors it needs, or for
+    one of the derived sets (houses for sale, vacant houses, houses under offer,
+    houses without a quality index, owner-occupiers and homeless owners) which are
+    kept up to date as agents are added, removed or change state.
+
+    Every registered agent is given a sequence number in the order it was added,
+    which is the order in which the scheduler holds it, so the derived sets can be
+    returned in schedule order whenever the order of iteration matters.
+"""
+
+import numpy as np
+
+
+class AgentRegistry:
+    """
+    A class holding live per-type and derived indexes of the model's agents.
+
+    Attributes:
+    owners, houses, realtors (dict): sequence number -> agent, by type.
+    houses_for_sale (dict): houses with for_sale set.
+    vacant_houses (dict): houses without an owner.
+    houses_under_offer (dict): houses that an owner has made an offer on.
+    unrated_houses (dict): houses which have not yet been given a quality index.
+    owner_occupiers (dict): owners who live in a house.
+    homeless_owners (dict): owners without a house.
+
+    Methods:
+    add(agent):
+        Register an agent which has just been added to the scheduler.
+
+    remove(agent):
+        Forget an agent which has been removed from the scheduler.
+
+    update(agent):
+        Re-classify an agent into the derived sets after a change of state.
+
+    count(agent_type):
+        Get the number of live agents of a type.
+
+    of_type(agent_type):
+        Get the index holding the live agents of a type.
+
+    get(unique_id):
+        Get the live agent with a unique_id, or None.
+
+    sequence_of(agent):
+        Get the sequence number (position in the schedule) of a live agent.
+
+    in_schedule_order(index):
+        Get the agents of an index as a list in the order of the scheduler.
+
+    get_state():
+        Get the sequence numbers (and unique_ids) held by each index, as arrays.
+
+    set_state(state, agents):
+        Put back the indexes from get_state(), given the agents by unique_id.
+    """
+
+    # the derived indexes, and the index of the agents they are drawn from.
+    DERIVED = {
+        "houses_for_sale": "houses",
+        "vacant_houses": "houses",
+        "houses_under_offer": "houses",
+        "unrated_houses": "houses",
+        "owner_occupiers": "owners",
+        "homeless_owners": "owners",
+    }
+
+    def __init__(self):
+        self.owners = {}
+        self.houses = {}
+        self.realtors = {}
+
+        self.houses_for_sale = {}
+        self.vacant_houses = {}
+        self.houses_under_offer = {}
+        self.unrated_houses = {}
+        self.owner_occupiers = {}
+        self.homeless_owners = {}
+
+        self._by_type = {
+            "Owner": self.owners,
+            "House": self.houses,
+            "Realtor": self.realtors,
+        }
+        self._by_id = {}
+        self._sequence = {}
+        self._next_sequence = 0
+
+    def add(self, agent):
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        self._sequence[agent] = sequence
+        self._by_id[agent.unique_id] = agent
+        self._by_type[agent.agent_type][sequence] = agent
+        self._classify(sequence, agent)
+
+    def remove(self, agent):
+        sequence = self._sequence.pop(agent, None)
+        if sequence == None:
+            return
+
+        del self._by_id[agent.unique_id]
+        self._by_type[agent.agent_type].pop(sequence, None)
+        if agent.agent_type == "House":
+            for index in (
+                self.houses_for_sale,
+                self.vacant_houses,
+                self.houses_under_offer,
+                self.unrated_houses,
+            ):
+                index.pop(sequence, None)
+        elif agent.agent_type == "Owner":
+            self.owner_occupiers.pop(sequence, None)
+            self.homeless_owners.pop(sequence, None)
+
+    def update(self, agent):
+        # agents which are not (or no longer) in the schedule are ignored.
+        sequence = self._sequence.get(agent)
+        if sequence != None:
+            self._classify(sequence, agent)
+
+    def count(self, agent_type):
+        return len(self._by_type[agent_type])
+
+    def of_type(self, agent_type):
+        return self._by_type[agent_type]
+
+    def get(self, unique_id):
+        return self._by_id.get(unique_id)
+
+    def sequence_of(self, agent):
+        return self._sequence[agent]
+
+    def in_schedule_order(self, index):
+        return [index[sequence] for sequence in sorted(index)]
+
+    def get_state(self):
+        # the indexes are kept in the order they hold their agents.
+        state = {"next_sequence": np.array(self._next_sequence)}
+        for name in ("owners", "houses", "realtors"):
+            index = getattr(self, name)
+            state[name] = np.array(list(index), dtype=np.int64)
+            state[name + "_id"] = np.array(
+                [agent.unique_id for agent in index.values()], dtype=np.int64
+            )
+        for name in self.DERIVED:
+            state[name] = np.array(list(getattr(self, name)), dtype=np.int64)
+        return state
+
+    def set_state(self, state, agents):
+        self._by_id.clear()
+        self._sequence.clear()
+        for name in ("owners", "houses", "realtors"):
+            index = getattr(self, name)
+            index.clear()
+            for sequence, unique_id in zip(
+                state[name].tolist(), state[name + "_id"].tolist()
+            ):
+                agent = agents[unique_id]
+                index[sequence] = agent
+                self._by_id[unique_id] = agent
+                self._sequence[agent] = sequence
+        for name, of in self.DERIVED.items():
+            index = getattr(self, name)
+            index.clear()
+            for sequence in state[name].tolist():
+                index[sequence] = getattr(self, of)[sequence]
+        self._next_sequence = int(state["next_sequence"])
+
+    def _classify(self, sequence, agent):
+        if agent.agent_type == "House":
+            self._set_member(self.houses_for_sale, sequence, agent, agent.for_sale)
+            self._set_member(
+                self.vacant_houses, sequence, agent, agent.my_owner == None
+            )
+            self._set_member(
+                self.houses_under_offer, sequence, agent, agent.offered_to != None
+            )
+            self._set_member(self.unrated_houses, sequence, agent, agent.quality == 0)
+        elif agent.agent_type == "Owner":
+            has_house = agent.my_house != None
+            self._set_member(self.owner_occupiers, sequence, agent, has_house)
+            self._set_member(self.homeless_owners, sequence, agent, not has_house)
+
+    @staticmethod
+    def _set_member(index, sequence, agent, is_member):
+        if is_member:
+            index[sequence] = agent
+        else:
+            index.pop(sequence, None)
@@ -0,0 +1,182 @@
+"""The bulk model set up
+Description:
+    Sets up a new model's houses and owners all at once, in a handful of passes
+    over the HouseState and OwnerFinance arrays, rather than one agent at a time
+    (build_house(), create_owners(), and the valuation of the empty houses, the
+    quality indexes, the realtors' average prices and the initial records in
+    MesaModel.__init__()). The agents are only added to the scheduler once their
+    state is complete, so each is classified by the registry once.
+
+    The random numbers are drawn from the same generators, in the same order, as
+    when the agents are set up one at a time (the cells of the houses, their ends
+    of life, the occupied houses, the incomes, then the realtors of the initial
+    records), so a seeded model starts in exactly the same state.
+"""
+
+from agents.house import House
+from agents.owner import Owner
+from math import ceil
+import numpy as np
+import random
+import heapq
+
+
+def setup_in_bulk(model, n_houses):
+    """
+    Build n_houses houses, occupy some of them with new owners, and value and
+    record all of them, as MesaModel.__init__() does one agent at a time.
+
+    Parameters:
+    model (MesaModel): The model being set up, with its realtors placed.
+    n_houses (int): Number of houses to build.
+    """
+    houses = build_houses(model, n_houses)
+
+    # let occupied-houses n-of ((1 - initialVacancyRate) * count houses) houses
+    occupied = random.sample(houses, int((1 - model.initialVacancyRate) * n_houses))
+    price_occupied_houses(model, occupied)
+
+    state = model.house_state
+    slots = state.slots_of(houses)
+    value_empty_houses(model, houses, slots)
+
+    # set medianPriceOfHousesForSale median [sale-price] of houses
+    prices = state.prices_of(slots)
+    model.medianPriceOfHousesForSale = np.median(prices[prices > 0])
+
+    # set quality sale-price / medianPriceOfHousesForSale
+    # if quality > 3 [set quality 3] if quality < 0.3 [set quality 0.3]
+    state.quality[slots] = np.clip(prices / model.medianPriceOfHousesForSale, 0.3, 3)
+
+    # the houses are complete: schedule them, then their owners.
+    for house in houses:
+        model.add_agent(house)
+        if house.my_owner == None:
+            for realtor in house.local_realtors:
+                realtor.add_house(house)
+    for house in occupied:
+        owner = house.my_owner
+        model.add_agent(owner)
+        model.grid.place_agent(owner, house.pos)
+
+    # ; note the average price of a house in each realtor's territory
+    territories = {realtor: [] for realtor in model.registry.realtors.values()}
+    for house in houses:
+        for realtor in house.local_realtors:
+            territories[realtor].append(house)
+    for realtor, territory in territories.items():
+        realtor.set_realtor_average_price(territory)
+
+    # create some initial records of sales.
+    for house in houses:
+        house.set_realtor()
+        house.get_my_realtor().file_record(
+            house, house.get_sale_price(), model.current_step
+        )
+
+
+def build_houses(model, n_houses):
+    """
+    Build houses on random empty cells, initially empty and for sale, each with
+    an end of life, as build_house() does for one house.
+    """
+    houses = [House(model.get_new_id(), model) for i in range(n_houses)]
+    for house in houses:
+        model.grid.place_agent(house, model.grid.find_empty())
+        model.house_index.insert(house, house.pos)
+        house.local_realtors.extend(model.territory_map.local_realtors(house.pos))
+
+    # set end-of-life ticks +
+    #     int random-exponential ( HouseMeanLifetime * TicksPerYear )
+    lifetimes = np.random.exponential(
+        model.HouseMeanLifetime * model.TicksPerYear, size=n_houses
+    ).astype(np.int64)
+
+    state = model.house_state
+    slots = state.slots_of(houses)
+    cells = np.array([house.pos for house in houses], dtype=np.int64).reshape(-1, 2)
+    state.x[slots] = cells[:, 0]
+    state.y[slots] = cells[:, 1]
+    state.for_sale[slots] = True
+    state.date_for_sale[slots] = model.current_step
+    state.end_of_life[slots] = model.current_step + lifetimes
+    for house, end_of_life in zip(houses, state.end_of_life[slots].tolist()):
+        heapq.heappush(model.end_of_life_queue, (end_of_life, house.house_id, house))
+    return houses
+
+
+def price_occupied_houses(model, occupied):
+    """
+    Give each occupied house a new owner, with an income, a mortgage on the
+    house and its repayment, and price the house at the mortgage plus deposit.
+    """
+    owners = [Owner(model.get_new_id(), house, model) for house in occupied]
+    for house, owner in zip(occupied, owners):
+        house.set_owner(owner)
+
+    # assign-income
+    finance = model.owner_finance
+    owner_slots = finance.slots_of(owners)
+    incomes = model.sample_incomes(len(owners), model.current_step)
+    finance.capital[owner_slots] = incomes * model.Savings / 100
+
+    # if InitialGeography = "Gradient" [ set income income * ( xcor + ycor + 50) / 50 ]
+    if model.InitialGeography == "Gradient":
+        cells = np.array([house.pos for house in occupied], dtype=np.int64)
+        incomes = incomes * (cells[:, 0] + cells[:, 1] + 50) / 50
+    finance.set_incomes(owner_slots, incomes)
+
+    # set mortgage to a multiple of my income.
+    mortgages = (
+        incomes
+        * model.Affordability
+        / (model.interestPerTick * model.TicksPerYear * 100)
+    )
+
+    # ; calculate value of the deposit for this house
+    deposits = mortgages * (100 / model.MaxLoanToValue - 1)
+
+    # ; set value of house to the mortgage + deposit
+    state = model.house_state
+    house_slots = state.slots_of(occupied)
+    state.for_sale[house_slots] = False
+    state.set_prices(house_slots, mortgages + deposits)
+
+    # set the repayment value
+    repayments = (
+        mortgages
+        * model.interestPerTick
+        / (
+            1
+            - (1 + model.interestPerTick)
+            ** (-model.MortgageDuration * model.TicksPerYear)
+        )
+    )
+    finance.set_loans(owner_slots, mortgages, repayments)
+
+
+def value_empty_houses(model, houses, slots):
+    """
+    ask houses with [ sale-price = 0 ] [
+      let local-houses houses with [distance myself < Locality and sale-price > 0]
+      ifelse any? local-houses
+        [ set sale-price  median [ sale-price ] of local-houses]
+        [ set sale-price  median-price ]
+      ]
+    """
+    state = model.house_state
+    prices = state.prices_of(slots)
+    median_price = np.median(prices[prices > 0])
+
+    # the medians around all the empty houses are taken at once from the layers.
+    layers = model.grid_layers
+    layers.refresh("price")
+    empty = slots[prices == 0]
+    cells = np.stack([state.x[empty], state.y[empty]], axis=1)
+    # int(distance) < Locality, i.e. distance < ceil(Locality)
+    local_medians = layers.disc_medians(
+        layers.price, layers.price > 0, cells, ceil(model.Locality)
+    )
+    state.set_prices(
+        empty, np.where(np.isnan(local_medians), median_price, local_medians)
+    )
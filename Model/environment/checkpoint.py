@@ -0,0 +1,400 @@
+"""The model checkpoint
+Description:
+    A checkpoint of a running model written to a single NumPy .npz file, from
+    which the model can be restored later, in another process, and stepped on
+    exactly as it would have been had it not stopped.
+
+    Rather than pickling the model's object graph (every agent, with its
+    references to other agents, one object at a time) the checkpoint is made of
+    typed arrays: a column per agent attribute, with each reference to another
+    agent held as that agent's unique_id (NONE for None), the columns of the
+    OwnerFinance, HouseState and SalesLedger arrays as they are, and the contents
+    of the scheduler, the registry and the model's other indexes as unique_ids in
+    the order they hold them. The model's parameters and counters, and the states
+    of the random number generators it draws from (the model's own, random and
+    np.random), are kept in a small JSON header.
+
+    The indexes which are worked out from the rest of the model (the realtors'
+    territories, the raster layers of the grid) are built again on restoring, and
+    those which only last for a tick (the houses for sale by price, the
+    valuations, the statistics) start empty, as they do at the start of a step.
+
+    Example, checkpointing a run every 100 ticks and resuming it later:
+        if model.current_step % 100 == 0:
+            save_checkpoint(model, "run.npz")
+        ...
+        model = load_checkpoint("run.npz")
+"""
+
+from environment.mesa_model import MesaModel
+from environment.territory_map import TerritoryMap
+from environment.slot_arrays import NONE
+from agents.realtor import Realtor
+from agents.house import House
+from agents.owner import Owner
+from mesa import Agent
+import numpy as np
+import random
+import json
+import gc
+
+VERSION = 5
+
+
+def save_checkpoint(model, file, compressed=False):
+    """
+    Write a checkpoint of a model to file (a path or a file object); compressed
+    makes the file smaller but slower to write and read.
+    """
+    arrays = checkpoint_arrays(model)
+    if compressed:
+        np.savez_compressed(file, **arrays)
+    else:
+        np.savez(file, **arrays)
+
+
+def load_checkpoint(file):
+    """
+    Get a new model, in the state the model a checkpoint was written of was in,
+    and put the random number generators back in the states they were in.
+    """
+    with np.load(file) as arrays:
+        return restore_model({name: arrays[name] for name in arrays.files})
+
+
+def _id_of(agent):
+    if agent == None:
+        return NONE
+    return agent.unique_id
+
+
+def _value(value):
+    if value == None:
+        return NONE
+    return value
+
+
+def _positions(agents):
+    return np.array(
+        [(NONE, NONE) if agent.pos == None else agent.pos for agent in agents],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+
+def _flatten(lists):
+    # lists of agents, as their unique_ids one list after the other and the lengths.
+    return (
+        np.array(
+            [agent.unique_id for agents in lists for agent in agents], dtype=np.int64
+        ),
+        np.array([len(agents) for agents in lists], dtype=np.int64),
+    )
+
+
+def checkpoint_arrays(model):
+    """
+    Get the checkpoint of a model, as a dict of arrays.
+    """
+    arrays = {}
+
+    def add(part, state):
+        for name, array in state.items():
+            arrays[part + "." + name] = array
+
+    # the parameters and counters, NumPy scalars noted so as to be put back as such.
+    attributes = {}
+    numpy_attributes = {}
+    for name, value in vars(model).items():
+        if isinstance(value, np.generic):
+            numpy_attributes[name] = value.dtype.str
+            attributes[name] = value.item()
+        elif value == None or isinstance(value, (bool, int, float, str)):
+            attributes[name] = value
+
+    realtors = list(model.registry.realtors.values())
+    houses = list(model.registry.houses.values())
+    owners = list(model.registry.owners.values())
+
+    my_houses, n_my_houses = _flatten(
+        [sorted(realtor.my_houses, key=_id_of) for realtor in realtors]
+    )
+    add(
+        "realtor",
+        {
+            "id": np.array([realtor.unique_id for realtor in realtors], dtype=np.int64),
+            "company": np.array([realtor.company for realtor in realtors], dtype=str),
+            "average_price": np.array(
+                [realtor.average_price for realtor in realtors], dtype=np.float64
+            ),
+            "pos": _positions(realtors),
+            "my_houses": my_houses,
+            "n_my_houses": n_my_houses,
+        },
+    )
+
+    local_realtors, n_local_realtors = _flatten(
+        [house.local_realtors for house in houses]
+    )
+    add(
+        "house",
+        {
+            "id": np.array([house.unique_id for house in houses], dtype=np.int64),
+            "slot": np.array([house.slot for house in houses], dtype=np.int64),
+            "pos": _positions(houses),
+            "my_owner": np.array(
+                [_id_of(house.my_owner) for house in houses], dtype=np.int64
+            ),
+            "my_realtor": np.array(
+                [_id_of(house.my_realtor) for house in houses], dtype=np.int64
+            ),
+            "offered_to": np.array(
+                [_id_of(house.offered_to) for house in houses], dtype=np.int64
+            ),
+            "offer_date": np.array(
+                [_value(house.offer_date) for house in houses], dtype=np.int64
+            ),
+            "occupied": np.array([house.occupied for house in houses], dtype=bool),
+            "local_realtors": local_realtors,
+            "n_local_realtors": n_local_realtors,
+        },
+    )
+
+    add(
+        "owner",
+        {
+            "id": np.array([owner.unique_id for owner in owners], dtype=np.int64),
+            "slot": np.array([owner.slot for owner in owners], dtype=np.int64),
+            "pos": _positions(owners),
+            "my_house": np.array(
+                [_id_of(owner.my_house) for owner in owners], dtype=np.int64
+            ),
+            "made_offer_on": np.array(
+                [_id_of(owner.made_offer_on) for owner in owners], dtype=np.int64
+            ),
+            "date_of_purchase": np.array(
+                [_value(owner.date_of_purchase) for owner in owners], dtype=np.int64
+            ),
+        },
+    )
+
+    # the scheduler's order is the order the agents are shuffled from.
+    arrays["schedule"] = np.array(list(model.schedule._agents), dtype=np.int64)
+    add("registry", model.registry.get_state())
+    add("unique_ids", model.unique_ids.get_state())
+    add("grid", model.grid.get_state())
+    add("house_index", model.house_index.get_state())
+    add("sales_ledger", model.sales_ledger.get_state())
+    add("owner_finance", model.owner_finance.get_state())
+    add("house_state", model.house_state.get_state())
+    # the houses demolished early are left in the queue, by unique_id, until due.
+    arrays["end_of_life_queue"] = np.array(
+        [
+            (end_of_life, unique_id)
+            for end_of_life, unique_id, house in model.end_of_life_queue
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    # the values collected so far, a reporter can give None when it has no value.
+    reporters = list(model.datacollector.model_vars)
+    for i, name in enumerate(reporters):
+        values = model.datacollector.model_vars[name]
+        missing = np.array([value == None for value in values], dtype=bool)
+        arrays["collected.%d" % i] = np.array(
+            [np.nan if value == None else value for value in values]
+        )
+        arrays["missing.%d" % i] = missing
+
+    model_random = model.random.getstate()
+    global_random = random.getstate()
+    numpy_random = np.random.get_state()
+    arrays["random.model"] = np.array(model_random[1], dtype=np.uint32)
+    arrays["random.global"] = np.array(global_random[1], dtype=np.uint32)
+    arrays["random.numpy"] = numpy_random[1]
+
+    header = {
+        "version": VERSION,
+        "width": model.grid.width,
+        "height": model.grid.height,
+        "attributes": attributes,
+        "numpy_attributes": numpy_attributes,
+        "schedule": [model.schedule.steps, model.schedule.time],
+        "reporters": reporters,
+        "random": {
+            "model": [model_random[0], model_random[2]],
+            "global": [global_random[0], global_random[2]],
+            "numpy": [numpy_random[0]] + list(numpy_random[2:]),
+        },
+    }
+    arrays["header"] = np.array(json.dumps(header))
+    return arrays
+
+
+def _new_agent(agent_type, unique_id, model):
+    # the agent's state is put back as it was, rather than set up by __init__.
+    agent = agent_type.__new__(agent_type)
+    Agent.__init__(agent, unique_id, model)
+    return agent
+
+
+def _unflatten(ids, lengths, agents):
+    ids = ids.tolist()
+    lists = []
+    start = 0
+    for length in lengths.tolist():
+        lists.append([agents[unique_id] for unique_id in ids[start : start + length]])
+        start += length
+    return lists
+
+
+def restore_model(arrays):
+    """
+    Get a new model from a checkpoint given as a dict of arrays.
+    """
+    # the agents are all made at once, which would set the garbage collector off
+    # again and again with nothing to collect.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        return _restore_model(arrays)
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _restore_model(arrays):
+    header = json.loads(str(arrays["header"]))
+    if header["version"] != VERSION:
+        raise ValueError("Unknown checkpoint version: %s" % header["version"])
+
+    def part(name):
+        prefix = name + "."
+        return {
+            key[len(prefix) :]: array
+            for key, array in arrays.items()
+            if key.startswith(prefix)
+        }
+
+    def agent_of(unique_id):
+        if unique_id == NONE:
+            return None
+        return agents[unique_id]
+
+    def pos_of(pos):
+        if pos[0] == NONE:
+            return None
+        return tuple(pos)
+
+    model = MesaModel.__new__(MesaModel)
+    for name, value in header["attributes"].items():
+        if name in header["numpy_attributes"]:
+            value = np.dtype(header["numpy_attributes"][name]).type(value)
+        setattr(model, name, value)
+    model.create_environment(header["width"], header["height"])
+
+    # the agents are made first, and then given their references to each other.
+    realtor = part("realtor")
+    house = part("house")
+    owner = part("owner")
+    agents = {}
+    realtors = []
+    for unique_id, company, average_price in zip(
+        realtor["id"].tolist(), realtor["company"].tolist(), realtor["average_price"]
+    ):
+        a = _new_agent(Realtor, unique_id, model)
+        a.realtor_id = unique_id
+        a.agent_type = "Realtor"
+        a.company = company
+        a.sales = model.sales_ledger
+        a.average_price = average_price
+        agents[unique_id] = a
+        realtors.append(a)
+
+    houses = []
+    for unique_id, slot, offer_date, occupied in zip(
+        house["id"].tolist(),
+        house["slot"].tolist(),
+        house["offer_date"].tolist(),
+        house["occupied"].tolist(),
+    ):
+        a = _new_agent(House, unique_id, model)
+        a.state = model.house_state
+        a.slot = slot
+        a.house_id = unique_id
+        a.agent_type = "House"
+        a.offer_date = None if offer_date == NONE else offer_date
+        a.occupied = occupied
+        agents[unique_id] = a
+        houses.append(a)
+
+    owners = []
+    for unique_id, slot, date_of_purchase in zip(
+        owner["id"].tolist(), owner["slot"].tolist(), owner["date_of_purchase"].tolist()
+    ):
+        a = _new_agent(Owner, unique_id, model)
+        a.finance = model.owner_finance
+        a.slot = slot
+        a.owner_id = unique_id
+        a.agent_type = "Owner"
+        a.date_of_purchase = None if date_of_purchase == NONE else date_of_purchase
+        agents[unique_id] = a
+        owners.append(a)
+
+    for a, my_houses in zip(
+        realtors, _unflatten(realtor["my_houses"], realtor["n_my_houses"], agents)
+    ):
+        a.my_houses = set(my_houses)
+    for a, my_owner, my_realtor, offered_to, local_realtors in zip(
+        houses,
+        house["my_owner"].tolist(),
+        house["my_realtor"].tolist(),
+        house["offered_to"].tolist(),
+        _unflatten(house["local_realtors"], house["n_local_realtors"], agents),
+    ):
+        a.my_owner = agent_of(my_owner)
+        a.local_realtors = local_realtors
+        a.my_realtor = agent_of(my_realtor)
+        a.offered_to = agent_of(offered_to)
+    for a, my_house, made_offer_on in zip(
+        owners, owner["my_house"].tolist(), owner["made_offer_on"].tolist()
+    ):
+        a.my_house = agent_of(my_house)
+        a.made_offer_on = agent_of(made_offer_on)
+
+    for unique_id in arrays["schedule"].tolist():
+        model.schedule.add(agents[unique_id])
+    model.schedule.steps, model.schedule.time = header["schedule"]
+    model.registry.set_state(part("registry"), agents)
+    model.unique_ids.set_state(part("unique_ids"))
+    model.grid.set_state(part("grid"), agents)
+    for group, a in ((realtor, realtors), (house, houses), (owner, owners)):
+        for agent, pos in zip(a, group["pos"].tolist()):
+            agent.pos = pos_of(pos)
+    model.house_index.set_state(part("house_index"), agents)
+    model.sales_ledger.set_state(part("sales_ledger"))
+    model.owner_finance.set_state(part("owner_finance"))
+    model.house_state.set_state(part("house_state"))
+    model.end_of_life_queue = [
+        (end_of_life, unique_id, agents.get(unique_id))
+        for end_of_life, unique_id in arrays["end_of_life_queue"].tolist()
+    ]
+
+    # Realtors do not move, so their territories are worked out from their places.
+    model.territory_map = TerritoryMap(
+        model.grid.width, model.grid.height, realtors, model.RealtorTerritory - 1
+    )
+    model.grid_layers.refresh()
+
+    for i, name in enumerate(header["reporters"]):
+        values = arrays["collected.%d" % i].tolist()
+        for j in np.flatnonzero(arrays["missing.%d" % i]).tolist():
+            values[j] = None
+        model.datacollector.model_vars[name] = values
+
+    version, gauss_next = header["random"]["model"]
+    model.random.setstate((version, tuple(arrays["random.model"].tolist()), gauss_next))
+    version, gauss_next = header["random"]["global"]
+    random.setstate((version, tuple(arrays["random.global"].tolist()), gauss_next))
+    name, pos, has_gauss, cached_gaussian = header["random"]["numpy"]
+    np.random.set_state((name, arrays["random.numpy"], pos, has_gauss, cached_gaussian))
+    return model
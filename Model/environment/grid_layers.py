@@ -0,0 +1,138 @@
+"""The GridLayers object
+Description:
+    Raster layers over the grid, one NumPy array cell per grid cell, built from the
+    HouseState arrays: whether a house stands on the cell, its quality index and
+    its sale price. A question about the houses around a cell ("the houses within
+    Locality of it") is then answered from the layers, rather than by searching
+    the houses around it one by one:
+
+    local_sum() adds up a layer over the Moore neighbourhood of every cell of the
+    torus at once, as a box filter (a sum of shifted copies of the layer), e.g.
+    the number of houses around every cell.
+
+    add_around() keeps such sums up to date when a value is added to one cell, by
+    adding it to the sums of the cells around it, e.g. the quality of each new
+    house as it is rated.
+
+    disc_medians() gives the medians of a layer over the cells within a distance
+    (not wrapping round, as SpatialIndex.within()) of many cells at once.
+"""
+
+from math import ceil
+import numpy as np
+
+
+class GridLayers:
+    """
+    A class holding raster layers of the houses on the grid.
+
+    Parameters:
+    width (int): Width of the grid.
+    height (int): Height of the grid.
+    house_state (HouseState): The state of the houses.
+
+    Attributes:
+    present (numpy.ndarray): Whether a house stands on each cell.
+    quality (numpy.ndarray): The quality index of the house on each cell, or 0.
+    price (numpy.ndarray): The sale price of the house on each cell, or 0.
+
+    Methods:
+    refresh(*layers):
+        Rebuild some of the layers, by default all of them, from the houses.
+
+    local_sum(layer, radius):
+        Get the sum of a layer over the Moore neighbourhood of every cell.
+
+    add_around(sums, pos, radius, value):
+        Add value at pos to sums, the local_sum() of a layer over radius.
+
+    disc_medians(layer, mask, cells, radius, inclusive=False):
+        Get the median of a layer over the cells of mask within radius of some cells.
+    """
+
+    LAYERS = ("present", "quality", "price")
+
+    def __init__(self, width, height, house_state):
+        self.width = width
+        self.height = height
+        self.house_state = house_state
+        self.present = np.zeros((width, height), dtype=bool)
+        self.quality = np.zeros((width, height))
+        self.price = np.zeros((width, height))
+
+    def refresh(self, *layers):
+        if len(layers) == 0:
+            layers = self.LAYERS
+        state = self.house_state
+        slots = np.flatnonzero(state.live)
+        # houses not yet built on a cell are left out.
+        slots = slots[state.x[slots] >= 0]
+        x = state.x[slots]
+        y = state.y[slots]
+
+        if "present" in layers:
+            self.present[:] = False
+            self.present[x, y] = True
+        if "quality" in layers:
+            self.quality[:] = 0
+            self.quality[x, y] = state.quality[slots]
+        if "price" in layers:
+            self.price[:] = 0
+            self.price[x, y] = state.prices_of(slots)
+
+    def _include_centre(self, radius):
+        # on a small torus the neighbourhood wraps round onto the centre cell.
+        return radius >= self.width or radius >= self.height
+
+    @staticmethod
+    def _offsets(radius, size):
+        # the distinct offsets of the neighbourhood, at most one full turn.
+        radius = min(int(radius), size)
+        return sorted({dx % size for dx in range(-radius, radius + 1)})
+
+    def local_sum(self, layer, radius):
+        layer = layer.astype(np.float64)
+        across = np.zeros_like(layer)
+        for dx in self._offsets(radius, self.width):
+            across += np.roll(layer, -dx, axis=0)
+        total = np.zeros_like(layer)
+        for dy in self._offsets(radius, self.height):
+            total += np.roll(across, -dy, axis=1)
+        if not self._include_centre(radius):
+            total -= layer
+        return total
+
+    def add_around(self, sums, pos, radius, value):
+        # the cells whose neighbourhood holds pos are those in the neighbourhood of pos.
+        x, y = pos
+        xs = [(x + dx) % self.width for dx in self._offsets(radius, self.width)]
+        ys = [(y + dy) % self.height for dy in self._offsets(radius, self.height)]
+        sums[np.ix_(xs, ys)] += value
+        if not self._include_centre(radius):
+            sums[x, y] -= value
+
+    def disc_medians(self, layer, mask, cells, radius, inclusive=False):
+        # the offsets of the cells within radius of a cell.
+        reach = ceil(radius)
+        dx, dy = np.meshgrid(
+            np.arange(-reach, reach + 1), np.arange(-reach, reach + 1), indexing="ij"
+        )
+        distance = np.sqrt(dx**2 + dy**2)
+        near = (distance < radius) | (inclusive & (distance == radius))
+        dx = dx[near]
+        dy = dy[near]
+
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        xs = cells[:, 0][:, None] + dx[None, :]
+        ys = cells[:, 1][:, None] + dy[None, :]
+        on_grid = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs = np.where(on_grid, xs, 0)
+        ys = np.where(on_grid, ys, 0)
+        counted = on_grid & mask[xs, ys]
+
+        medians = np.full(len(cells), np.nan)
+        found = counted.any(axis=1)
+        if found.any():
+            values = np.where(counted, layer[xs, ys], np.nan)
+            medians[found] = np.nanmedian(values[found], axis=1)
+        return medians
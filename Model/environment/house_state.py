@@ -0,0 +1,120 @@
+"""The HouseState object
+Description:
+    The state of the houses (sale price, whether for sale, the date put on the
+    market, quality index, end of life and the cell the house was built on) held
+    as NumPy arrays, one slot per house, in the same way as the owners' finances
+    are held in OwnerFinance.
+
+    Every tick the price of each house still for sale drops by PriceDropRate. The
+    prices are not rewritten every tick: decay() only counts the drop, and a house
+    for sale keeps the price it was listed (or last repriced) at and the number of
+    drops counted by then, so that its price is worked out when it is read as
+
+        listed price * (1 - PriceDropRate / 100) ^ (drops since it was listed)
+
+    A tick's drop costs the same whatever the number of houses for sale. Should the
+    rate change, the houses for sale are re-based on their prices at the old rate.
+"""
+
+from environment.slot_arrays import SlotArrays, NONE
+import numpy as np
+
+
+class HouseState(SlotArrays):
+    """
+    A class holding the state of the houses in NumPy arrays, indexed by slot.
+
+    Parameters:
+    capacity (int): Initial number of slots, doubled whenever they are all in use.
+
+    Attributes:
+    price (numpy.ndarray): The sale prices, for a house for sale the price it was
+        listed at.
+    listed (numpy.ndarray): The number of drops counted when each price was set.
+    for_sale, date_for_sale, quality, end_of_life (numpy.ndarray): The columns.
+    x, y (numpy.ndarray): The cell of each house, houses do not move.
+    live (numpy.ndarray): Whether a slot belongs to a house in the model.
+
+    Methods:
+    decay(factor):
+        Drop the prices of all houses for sale by factor.
+
+    price_of(slot), prices_of(slots):
+        Get the current sale price of one house, or of some houses as an array.
+
+    set_price(slot, price), set_prices(slots, prices):
+        Set the sale price of one house, or of some houses.
+
+    set_for_sale(slot, decision):
+        Put a house on or take it off the market.
+
+    place(slot, pos):
+        Note the cell a house has been built on.
+    """
+
+    COLUMNS = {
+        "price": (np.float64, 0),
+        "listed": (np.int64, 0),
+        "for_sale": (np.bool_, False),
+        "date_for_sale": (np.int64, NONE),
+        "quality": (np.float64, 0),
+        "end_of_life": (np.int64, NONE),
+        "x": (np.int64, NONE),
+        "y": (np.int64, NONE),
+    }
+
+    def __init__(self, capacity=1024):
+        super().__init__(capacity)
+        self._drops = 0
+        self._factor = 1.0
+
+    def allocate(self):
+        slot = super().allocate()
+        self.listed[slot] = self._drops
+        return slot
+
+    def decay(self, factor):
+        if factor != self._factor:
+            on_sale = np.flatnonzero(self.for_sale & self.live)
+            self.set_prices(on_sale, self.prices_of(on_sale))
+            self._factor = factor
+        self._drops += 1
+
+    def price_of(self, slot):
+        price = self.price.item(slot)
+        if self.for_sale.item(slot):
+            price = price * self._factor ** (self._drops - self.listed.item(slot))
+        return price
+
+    def prices_of(self, slots):
+        slots = np.asarray(slots, dtype=np.int64)
+        drops = np.where(self.for_sale[slots], self._drops - self.listed[slots], 0)
+        return self.price[slots] * self._factor**drops
+
+    def set_price(self, slot, price):
+        self.price[slot] = price
+        self.listed[slot] = self._drops
+
+    def set_prices(self, slots, prices):
+        self.price[slots] = prices
+        self.listed[slots] = self._drops
+
+    def set_for_sale(self, slot, decision):
+        # the price stops (or starts) dropping from what it is now.
+        self.set_price(slot, self.price_of(slot))
+        self.for_sale[slot] = decision
+
+    def place(self, slot, pos):
+        self.x[slot] = pos[0]
+        self.y[slot] = pos[1]
+
+    def get_state(self):
+        state = super().get_state()
+        state["drops"] = np.array(self._drops)
+        state["factor"] = np.array(self._factor)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self._drops = int(state["drops"])
+        self._factor = float(state["factor"])
@@ -0,0 +1,117 @@
+"""The HousingGrid object
+Description:
+    The MultiGrid the model's agents live on, keeping a count of its empty cells
+    in a Fenwick (binary indexed) tree over the cells in (x, y) order. MultiGrid
+    picks a random empty cell by sorting all of the empty cells and choosing one of
+    them, which on a large, dense grid has to be done for every house that is
+    built. With the tree, the cell a draw picks (the k-th empty cell in sorted
+    order) is found in O(log cells), and the tree is updated in O(log cells) when a
+    cell fills up or is emptied.
+
+    find_empty() draws exactly as MultiGrid.find_empty() does, from the global
+    random number generator, so a seeded run builds its houses on the same cells.
+"""
+
+from mesa.space import MultiGrid
+from mesa import Agent
+import numpy as np
+import random
+
+
+class HousingGrid(MultiGrid):
+    """
+    A MultiGrid which can pick a random empty cell without sorting the empty cells.
+
+    Parameters:
+    width (int): Width of the grid.
+    height (int): Height of the grid.
+    torus (bool): Whether the grid wraps round at its edges.
+
+    Methods:
+    find_empty():
+        Pick a random empty cell, None if there are none.
+
+    get_state():
+        Get the unique_ids of the agents on each cell, in (x, y) order.
+
+    set_state(state, agents):
+        Place the agents of get_state() again, given the live agents by unique_id.
+    """
+
+    def __init__(self, width, height, torus):
+        super().__init__(width, height, torus)
+        self._cells = width * height
+        # every cell starts empty: node i counts the cells (i - lowbit(i), i].
+        self._tree = [0] + [i & -i for i in range(1, self._cells + 1)]
+        self._top_bit = 1 << (self._cells.bit_length() - 1) if self._cells > 0 else 0
+
+    def _place_agent(self, pos, agent):
+        was_empty = pos in self.empties
+        super()._place_agent(pos, agent)
+        if was_empty:
+            self._count(pos, -1)
+
+    def _remove_agent(self, pos, agent):
+        was_empty = pos in self.empties
+        super()._remove_agent(pos, agent)
+        if not was_empty and pos in self.empties:
+            self._count(pos, 1)
+
+    def _count(self, pos, change):
+        i = pos[0] * self.height + pos[1] + 1
+        while i <= self._cells:
+            self._tree[i] += change
+            i += i & -i
+
+    def _kth_empty(self, k):
+        # walk down the tree to the cell with k empty cells before it.
+        i = 0
+        bit = self._top_bit
+        while bit > 0:
+            if i + bit <= self._cells and self._tree[i + bit] <= k:
+                i += bit
+                k -= self._tree[i]
+            bit >>= 1
+        return divmod(i, self.height)
+
+    def find_empty(self):
+        if self.exists_empty_cells():
+            # random.choice(sorted(self.empties)) without the sort.
+            return self._kth_empty(random.randrange(len(self.empties)))
+        else:
+            return None
+
+    def get_state(self):
+        ids = []
+        cells = []
+        for x, column in enumerate(self.grid):
+            for y, contents in enumerate(column):
+                for agent in contents:
+                    ids.append(agent.unique_id)
+                    cells.append((x, y))
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "pos": np.array(cells, dtype=np.int64).reshape(-1, 2),
+        }
+
+    def set_state(self, state, agents):
+        # the agents' pos is not set: an agent can be on more than one cell.
+        left = {}
+        for unique_id, pos in zip(state["id"].tolist(), state["pos"].tolist()):
+            agent = agents.get(unique_id)
+            if agent == None:
+                # an owner who moved house was placed on the new house's cell
+                # without leaving the old one (see Owner.move_house()), and is
+                # still there after leaving the model; all that is left of them is
+                # that the cell is not empty.
+                agent = left.setdefault(unique_id, Agent(unique_id, None))
+            MultiGrid._place_agent(self, tuple(pos), agent)
+
+        # the tree is built over all the cells at once rather than a cell at a time.
+        self._tree = [0] * (self._cells + 1)
+        for x, y in self.empties:
+            self._tree[x * self.height + y + 1] = 1
+        for i in range(1, self._cells + 1):
+            parent = i + (i & -i)
+            if parent <= self._cells:
+                self._tree[parent] += self._tree[i]
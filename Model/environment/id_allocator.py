@@ -0,0 +1,66 @@
+"""The UniqueIDAllocator object
+Description:
+    Hands out the unique_id of every agent created by the model. IDs come from a
+    monotonic counter, so allocating one is O(1) and an ID is never handed out
+    twice, even after the agent holding it has died. The IDs of agents which are
+    still alive are kept in a set so that liveness checks are O(1) as well.
+"""
+
+import numpy as np
+
+
+class UniqueIDAllocator:
+    """
+    A class allocating unique agent IDs and tracking which of them are live.
+
+    Parameters:
+    first_id (int): The first ID to hand out.
+
+    Methods:
+    new_id():
+        Allocate a new, never used before, ID and mark it as live.
+
+    release(unique_id):
+        Mark the ID of an agent which has died as no longer live.
+
+    is_live(unique_id):
+        Check whether an ID belongs to an agent which is still alive.
+
+    get_state():
+        Get the next ID and the live IDs, as arrays.
+
+    set_state(state):
+        Put back the next ID and the live IDs from get_state().
+    """
+
+    def __init__(self, first_id=0):
+        self._next_id = first_id
+        self._live = set()
+
+    def new_id(self):
+        unique_id = self._next_id
+        self._next_id += 1
+        self._live.add(unique_id)
+        return unique_id
+
+    def release(self, unique_id):
+        self._live.discard(unique_id)
+
+    def is_live(self, unique_id):
+        return unique_id in self._live
+
+    def __contains__(self, unique_id):
+        return self.is_live(unique_id)
+
+    def __len__(self):
+        return len(self._live)
+
+    def get_state(self):
+        return {
+            "next_id": np.array(self._next_id),
+            "live": np.array(sorted(self._live), dtype=np.int64),
+        }
+
+    def set_state(self, state):
+        self._next_id = int(state["next_id"])
+        self._live = set(state["live"].tolist())
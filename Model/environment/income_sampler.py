@@ -0,0 +1,55 @@
+"""The income sampler
+Description:
+    Draws the incomes of new owners in batches. An owner's income is drawn from a
+    gamma distribution, scaled to MeanIncome and to inflation so far, and redrawn
+    while it is less than half of MeanIncome (Owner.assign_income()). Rather than
+    drawing for each owner in turn, sample_incomes() draws the incomes of all the
+    owners at once, then redraws only those which were too low, until each owner
+    has one.
+
+    Each round draws exactly as many values as there are owners still without an
+    income, and the values kept are handed out in the order they were drawn, so
+    the owners get the same incomes, and the random number generator is left in
+    the same state, as when the incomes are drawn one owner at a time.
+"""
+
+import numpy as np
+
+ALPHA = 1.3  # shape parameter
+LAMBDA = 1 / 20000  # scale parameter
+
+
+def sample_incomes(
+    n, mean_income, inflation, ticks_per_year, current_timestep, random_state=None
+):
+    """
+    Draw the incomes of n new owners.
+
+    Parameters:
+    n (int): Number of incomes to draw.
+    mean_income (float): MeanIncome, incomes are at least half of it.
+    inflation (float): Inflation, percent per year.
+    ticks_per_year (int): TicksPerYear.
+    current_timestep (int): The tick, incomes are inflated up to it.
+    random_state (numpy.random.RandomState): The generator to draw from, by default
+        the global NumPy generator (np.random).
+
+    Returns:
+    numpy.ndarray: The n incomes, in the order they were drawn.
+    """
+    if random_state == None:
+        random_state = np.random
+    growth = (1 + (inflation / (ticks_per_year * 100))) ** current_timestep
+
+    incomes = np.empty(n)
+    filled = 0
+    while filled < n:
+        drawn = (
+            (mean_income * LAMBDA / ALPHA)
+            * random_state.gamma(shape=ALPHA, scale=ALPHA / LAMBDA, size=n - filled)
+            * growth
+        )
+        kept = drawn[drawn >= mean_income / 2]
+        incomes[filled : filled + len(kept)] = kept
+        filled += len(kept)
+    return incomes
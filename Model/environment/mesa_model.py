@@ -4,18 +4,30 @@ from mesa import Model
 from agents.realtor import Realtor
 from agents.house import House
 from agents.owner import Owner
-from agents.records import Records
+from environment.agent_registry import AgentRegistry
+from environment.id_allocator import UniqueIDAllocator
+from environment.spatial_index import SpatialIndex
+from environment.sales_ledger import SalesLedger
+from environment.metrics import MarketMetrics, gini
+from environment.price_index import PriceIndex
+from environment.territory_map import TerritoryMap
+from environment.housing_grid import HousingGrid
+from environment.owner_finance import OwnerFinance
+from environment.house_state import HouseState
+from environment.income_sampler import sample_incomes
+from environment.bulk_setup import setup_in_bulk
+from environment.valuation_cache import ValuationCache
+from environment.grid_layers import GridLayers
 from mesa.time import RandomActivation
-from mesa.space import MultiGrid
 from mesa.datacollection import DataCollector
 import numpy as np
 import pandas as pd
 from math import sqrt
 from math import sin
+from math import ceil
 import random
+import heapq
 from matplotlib import pyplot as plt
-import sys
-
 
 """
   Starting variables/macroeconomic parameters/main model class
@@ -40,75 +52,38 @@ import sys
 
 
 # Visualisation code -------------------------------------
+# The statistics are computed together by the model's MarketMetrics, once per
+# step, and each reporter reads its own value.
 def count_houses(model):
-    counter = 0
-    for houses in model.schedule.agents:
-        if houses.agent_type == "House":
-            counter += 1
-
-    return counter
+    return model.metrics.get("count_houses")
 
 
 def count_people_seeking_home(model):
-    counter = 0
-    seeking_a_house = [
-        i
-        for i in model.schedule.agents
-        if i.agent_type == "Owner" and (not i.get_my_house())
-    ]
-
-    for owners in seeking_a_house:
-        counter += 1
-
-    return counter
+    return model.metrics.get("count_people_seeking_home")
 
 
 def count_empty_houses(model):
-    counter = 0
-
-    empty_houses = [
-        i
-        for i in model.schedule.agents
-        if i.agent_type == "House" and (i.get_owner() == None)
-    ]
-
-    for houses in empty_houses:
-        counter += 1
-    return counter
+    return model.metrics.get("count_empty_houses")
 
 
 def ve_equity(model):
-    counter = 0
-    houses = [
-        i
-        for i in model.schedule.agents
-        if i.agent_type == "House"
-        and (
-            (i.get_owner() != None)
-            and (i.get_sale_price() < i.get_owner().get_mortgage())
-        )
-    ]
-
-    for house in houses:
-        counter += 1
-    return counter
+    return model.metrics.get("ve_equity")
 
 
 def demolished(model):
-    return model.nDemolished
+    return model.metrics.get("demolished")
 
 
 def people(model):
-    n_people = [i for i in model.schedule.agents if i.agent_type == "Owner"]
-    return len(n_people)
+    return model.metrics.get("people")
 
 
 def up_shocked(model):
-    return 10 * model.nUpShocked
+    return model.metrics.get("up_shocked")
 
 
 def down_shocked(model):
-    return 10 * model.nDownShocked
+    return model.metrics.get("down_shocked")
 
 
 def median_house_prices_for_sale(model):
@@ -121,17 +96,7 @@ def median_house_prices_for_sale(model):
     plot medianPriceOfHousesForSale]
     [ plot 0 ]
     """
-    houses_for_sale = [
-        i
-        for i in model.schedule.agents
-        if i.agent_type == "House"
-        and (i.is_house_for_sale() and i.get_sale_price() > 0)
-    ]
-
-    if len(houses_for_sale) > 0:
-        return model.medianPriceOfHousesForSale
-    else:
-        return 0
+    return model.metrics.get("median_house_prices_for_sale")
 
 
 def median_house_prices_for_sold(model):
@@ -141,91 +106,43 @@ def median_house_prices_for_sold(model):
     if any? houses-sold [ set medianSellingPriceOfHouses median [ selling-price ] of houses-sold ]
       plot medianSellingPriceOfHouses
     """
-    houses_sold = [i for i in model.schedule.agents if i.agent_type == "Record"]
-
-    medianSellingPriceOfHouses = 0
-
-    if len(houses_sold) > 0:
-        medianSellingPriceOfHouses = np.median(
-            [i.get_record_selling_price() for i in houses_sold]
-        )
-
-    return medianSellingPriceOfHouses
+    return model.metrics.get("median_house_prices_for_sold")
 
 
 def gini_index(list):
-    sorted_list = sorted(list)
-    total = sum(sorted_list)
-    items = len(list)
-    sum_so_far = 0
-    index = 0
-    gini = 0
-
-    for i in range(items):
-        sum_so_far = sum_so_far + sorted_list[index]
-        index += 1
-        gini = gini + (index / items) - (sum_so_far / total)
-
-    # only accurate if items is large
-    return 2 * (gini / items)
+    return gini(list)
 
 
 def gini_index_prices(model):
-    houses_sold = [i for i in model.schedule.agents if i.agent_type == "Record"]
-    if len(houses_sold) > 0:
-        return gini_index([i.get_record_selling_price() for i in houses_sold])
+    return model.metrics.get("gini_index_prices")
 
 
 def gini_index_incomes(model):
-    owner_incomes = [
-        i.get_income() for i in model.schedule.agents if i.agent_type == "Owner"
-    ]
-    if len(owner_incomes) > 0:
-        return gini_index(owner_incomes)
+    return model.metrics.get("gini_index_incomes")
 
 
 def mortgage_repayment_income(model):
-    owners = [
-        i
-        for i in model.schedule.agents
-        if i.agent_type == "Owner" and (i.get_repayment() > 0)
-    ]
-
-    if len(owners) > 0:
-        repayment = [i.get_repayment() for i in owners]
-        income = [i.get_income() for i in owners]
-        return model.TicksPerYear * (np.mean(repayment) / np.mean(income))
+    return model.metrics.get("mortgage_repayment_income")
 
 
 def median_house_prices(model):
-    owners = [i for i in model.schedule.agents if i.agent_type == "Owner"]
-    houses_sold = [i for i in model.schedule.agents if i.agent_type == "Record"]
-
-    if len(houses_sold) > 0 and len(owners) > 0:
-        income_of_owners = [i.get_income() for i in owners]
-        return median_house_prices_for_sold(model) / np.median(income_of_owners)
+    return model.metrics.get("median_house_prices")
 
 
 def median_time_on_market(model):
-    houses_for_sale = [
-        i.get_date_for_sale()
-        for i in model.schedule.agents
-        if i.agent_type == "House"
-        and (i.is_house_for_sale() == True and i.get_sale_price() > 0)
-    ]
-    return model.current_step - np.median(houses_for_sale)
+    return model.metrics.get("median_time_on_market")
 
 
 def transactions(model):
-    return model.moves
+    return model.metrics.get("transactions")
 
 
 def interest_rate(model):
-    return model.interestPerTick * model.TicksPerYear * 100
+    return model.metrics.get("interest_rate")
 
 
 def inflation_rate(model):
-    return model.Inflation
+    return model.metrics.get("inflation_rate")
 
 
 # Visualisation code ------------------------------------- END
@@ -269,8 +186,19 @@ class MesaModel(Model):
         StampDuty,
         scenario,
         intervention_step,
+        vectorised_owners=True,
+        bulk_setup=True,
+        seed=None,
     ):
+        # Model.__new__ seeds self.random with seed; the model also draws from the
+        # global random number generators, so they are seeded too.
+        if seed != None:
+            random.seed(seed)
+            np.random.seed(seed)
         self.running = True
+        # Why, and at which step, the run stopped early (see stop()).
+        self.termination_reason = None
+        self.termination_step = None
         self.nRealtors = nRealtors
         self.initialVacancyRate = initialVacancyRate
         self.InterestRate = InterestRate
@@ -299,91 +227,125 @@ class MesaModel(Model):
         self.MaxLoanToValue = MaxLoanToValue
         self.MortgageDuration = MortgageDuration
         self.StampDuty = StampDuty
-        # Instantiate a scheduler object
-        self.schedule = RandomActivation(self)
-        # Create a grid environment
-        self.grid = MultiGrid(width, height, torus=True)
-        self.total_number_of_agents = 0
         self.current_step = 0
         self.medianPriceOfHousesForSale = 0
         self.nUpShocked = 0
         self.nDownShocked = 0
         self.nDemolished = 0
-        self.uniqueIDs = []
         self.moves = 0
         self.scenario = scenario
         self.intervention_step = intervention_step
+        # If vectorised_owners is set the owner phases of the step work on the
+        # owners' finance arrays rather than owner by owner.
+        self.vectorised_owners = vectorised_owners
+        # Whether the houses and owners are set up in bulk or one at a time.
+        self.bulk_setup = bulk_setup
+        # The scheduler, the grid and the model's indexes and arrays, all empty.
+        self.create_environment(width, height)
 
         # Create and distribute realtor agents.
         for i in range(self.nRealtors):
-            a = Realtor(i, np.random.choice(UK_estate_agents), self)
-            self.schedule.add(a)
+            a = Realtor(self.get_new_id(), np.random.choice(UK_estate_agents), self)
+            self.add_agent(a)
             x = self.random.randrange(self.grid.width)
             y = self.random.randrange(self.grid.height)
             self.grid.place_agent(a, (x, y))
-            self.total_number_of_agents += 1
-            self.uniqueIDs.append(self.total_number_of_agents)
+
+        # Realtors do not move, so the local realtors of each cell are worked out once.
+        self.territory_map = TerritoryMap(
+            self.grid.width,
+            self.grid.height,
+            list(self.registry.realtors.values()),
+            self.RealtorTerritory - 1,
+        )
 
         # Create and distribute houses.
         total_grid_size = self.grid.width * self.grid.height  # count patches
 
-        for i in range(int(total_grid_size * self.Density / 100)):
-            self.total_number_of_agents = self.get_new_id()
-            self.build_house(self.total_number_of_agents)
+        n_houses = int(total_grid_size * self.Density / 100)
 
-        # create the owners, one per house
-        self.create_owners()
-
-        # ; value all empty houses according to average values of local occupied houses
-        median_price = self.get_median_house_sale_price()
-
-        """ask houses with [ sale-price = 0 ] [
-             let local-houses houses with [distance myself < Locality and sale-price > 0]
-             ifelse any? local-houses
-               [ set sale-price  median [ sale-price ] of local-houses]
-               [ set sale-price  median-price ]
-             ]"""
-
-        sale_price_zero_houses = [
-            i
-            for i in self.schedule.agents
-            if i.agent_type == "House" and (i.get_sale_price() == 0)
-        ]
-        all_other_houses = [
-            i
-            for i in self.schedule.agents
-            if i.agent_type == "House" and (i.get_sale_price() > 0)
-        ]
-        local_houses = []
+        if self.bulk_setup:
+            # the houses and owners are set up all at once, see bulk_setup.py.
+            setup_in_bulk(self, n_houses)
+        else:
+            for i in range(n_houses):
+                self.build_house(self.get_new_id())
 
-        for houses in sale_price_zero_houses:
-            for other_houses in all_other_houses:
-                if (
-                    int(self.calc_distance(houses.pos, other_houses.pos))
-                    < self.Locality
-                ):
-                    local_houses.append(other_houses)
+            # create the owners, one per house
+            self.create_owners()
 
-            if len(local_houses) > 0:
-                local_prices = []
-                for house in local_houses:
-                    local_prices.append(house.get_sale_price())
-                houses.set_sale_price(np.median(local_prices))
-            else:
-                houses.set_sale_price(median_price)
+            # ; value all empty houses according to average values of local occupied houses
+            median_price = self.get_median_house_sale_price()
+
+            """ask houses with [ sale-price = 0 ] [
+                 let local-houses houses with [distance myself < Locality and sale-price > 0]
+                 ifelse any? local-houses
+                   [ set sale-price  median [ sale-price ] of local-houses]
+                   [ set sale-price  median-price ]
+                 ]"""
+
+            sale_price_zero_houses = [
+                i for i in self.registry.houses.values() if i.get_sale_price() == 0
+            ]
+            all_other_houses = SpatialIndex(
+                self.grid.width, self.grid.height, self.Locality
+            )
+            for houses in self.registry.houses.values():
+                if houses.get_sale_price() > 0:
+                    all_other_houses.insert(houses, houses.pos)
+
+            for houses in sale_price_zero_houses:
+                # int(distance) < Locality, i.e. distance < ceil(Locality)
+                local_houses = all_other_houses.within(houses.pos, ceil(self.Locality))
 
-        # set medianPriceOfHousesForSale median [sale-price] of houses
-        self.medianPriceOfHousesForSale = self.get_median_house_sale_price()
+                if len(local_houses) > 0:
+                    local_prices = []
+                    for house in local_houses:
+                        local_prices.append(house.get_sale_price())
+                    houses.set_sale_price(np.median(local_prices))
+                else:
+                    houses.set_sale_price(median_price)
 
-        # calculate the quality index as a ratio of the house's price to the median price.
-        self.calculate_quality_index()
+            # set medianPriceOfHousesForSale median [sale-price] of houses
+            self.medianPriceOfHousesForSale = self.get_median_house_sale_price()
 
-        # ; note the average price of a house in each realtor's territory
-        self.set_average_house_prices_for_realtors()  # HERE--------->
+            # calculate the quality index as a ratio of the house's price to the median price.
+            self.calculate_quality_index()
 
-        # create some initial records of sales.
-        self.create_records()
+            # ; note the average price of a house in each realtor's territory
+            self.set_average_house_prices_for_realtors()  # HERE--------->
 
+            # create some initial records of sales.
+            self.create_records()
+
+    def create_environment(self, width, height):
+        # (also used to restore a model from a checkpoint, see checkpoint.py)
+        # Instantiate a scheduler object
+        self.schedule = RandomActivation(self)
+        # Live indexes of the scheduled agents by type and state.
+        self.registry = AgentRegistry()
+        # Create a grid environment
+        self.grid = HousingGrid(width, height, torus=True)
+        # Houses indexed by position for the "within Locality of" queries.
+        self.house_index = SpatialIndex(width, height, self.Locality)
+        # The realtors' records of house sales.
+        self.sales_ledger = SalesLedger(self.get_house)
+        # The houses for sale by price, rebuilt each step, less those under offer.
+        self.houses_by_price = PriceIndex()
+        # (end_of_life, unique_id, house) heap of the houses due to fall down.
+        self.end_of_life_queue = []
+        # The statistics collected by the DataCollector, computed once per step.
+        self.metrics = MarketMetrics(self)
+        # Monotonic allocator of agent IDs, IDs are never reused.
+        self.unique_ids = UniqueIDAllocator()
+        # The owners' finances, in arrays.
+        self.owner_finance = OwnerFinance()
+        # The houses' state, in arrays.
+        self.house_state = HouseState()
+        # Raster layers of the houses on the grid, for the "within Locality" queries.
+        self.grid_layers = GridLayers(width, height, self.house_state)
+        # The realtors' valuations of the houses newly for sale, kept for a tick.
+        self.valuation_cache = ValuationCache(self.Locality)
         # data to be visualised in the main_visualisation.py class.
         self.datacollector = DataCollector(
             model_reporters={
@@ -410,7 +372,15 @@ class MesaModel(Model):
 
     def step(self):
         "Advance model by one discrete step"
+        # a run which has stopped early stays as it was when it stopped.
+        if not self.running:
+            return
+        # the valuations remembered only hold for the tick they were made in.
+        self.valuation_cache.clear()
+        self.metrics.clear()
         self.datacollector.collect(self)
+        # the statistics only hold for the model as the DataCollector saw it.
+        self.metrics.clear()
         self.schedule.step()
 
         n_owners = self.get_number_of_agents("Owner")
@@ -442,8 +412,12 @@ class MesaModel(Model):
         ]
         """
         if self.Inflation > 0:
-            for owners in self.schedule.agents:
-                if owners.agent_type == "Owner":
+            if self.vectorised_owners:
+                self.owner_finance.inflate(
+                    1 + self.Inflation / (self.TicksPerYear * 100)
+                )
+            else:
+                for owners in self.registry.owners.values():
                     owners.set_income(
                         owners.get_income()
                         * (1 + self.Inflation / (self.TicksPerYear * 100))
@@ -454,7 +428,8 @@ class MesaModel(Model):
 
         # ; some have an income shock
         shocked_owners = random.sample(
-            owner_occupiers, int(self.Shocked * len(owner_occupiers) / 100)
+            owner_occupiers,
+            min(int(self.Shocked * len(owner_occupiers) / 100), len(owner_occupiers)),
         )
 
         # ; either a shock of 20% more income than before
@@ -462,51 +437,57 @@ class MesaModel(Model):
 
         self.nUpShocked = 0
 
-        for upshockedOwners in upshocked_owners:
-            upshockedOwners.set_income(upshockedOwners.get_income() * 1.2)
-
         # ; or a shock of 20% less income than before
         downshocked = list(set(shocked_owners) - set(upshocked_owners))
         self.nDownShocked = 0
 
-        for downShockedOwners in downshocked:
-            downShockedOwners.set_income(downShockedOwners.get_income() * 0.8)
-
-        for owner in owner_occupiers:
-            if owner.get_my_house().is_house_for_sale() == False:
-                my_house = owner.get_my_house()
-                """
-                ; if they are now spending less than half the Affordability ratio of their
-                ; income on their mortgage repayments, they want to move up
-                """
-                ratio = owner.get_repayment() * self.TicksPerYear / owner.get_income()
-                if ratio < self.Affordability / 200:
-                    my_house.put_on_market(self.current_step)
-                    self.nUpShocked = self.nUpShocked + 1
-                """
-                ; if they are now spending more than twice the Affordability ratio of
-                ; their income on their mortgage repayments, they want to move down
-                """
-                if ratio > self.Affordability / 50:
-                    my_house.put_on_market(self.current_step)
-                    self.nDownShocked = self.nDownShocked + 1
+        if self.vectorised_owners:
+            self.vectorised_income_shocks(
+                owner_occupiers, upshocked_owners, downshocked
+            )
+        else:
+            for upshockedOwners in upshocked_owners:
+                upshockedOwners.set_income(upshockedOwners.get_income() * 1.2)
+
+            for downShockedOwners in downshocked:
+                downShockedOwners.set_income(downShockedOwners.get_income() * 0.8)
+
+            for owner in owner_occupiers:
+                if owner.get_my_house().is_house_for_sale() == False:
+                    my_house = owner.get_my_house()
+                    """
+                    ; if they are now spending less than half the Affordability ratio of their
+                    ; income on their mortgage repayments, they want to move up
+                    """
+                    ratio = (
+                        owner.get_repayment() * self.TicksPerYear / owner.get_income()
+                    )
+                    if ratio < self.Affordability / 200:
+                        my_house.put_on_market(self.current_step)
+                        self.nUpShocked = self.nUpShocked + 1
+                    """
+                    ; if they are now spending more than twice the Affordability ratio of
+                    ; their income on their mortgage repayments, they want to move down
+                    """
+                    if ratio > self.Affordability / 50:
+                        my_house.put_on_market(self.current_step)
+                        self.nDownShocked = self.nDownShocked + 1
 
         # ; some owners put their houses on the market and leave town
 
+        # the exit rate is of all the owners, but only owner-occupiers can leave:
+        # when most owners are homeless (the houses are falling down) there may be
+        # fewer owner-occupiers than leavers.
+        owner_occupiers = self.update_owner_occupiers()
         owners_house_on_market = random.sample(
-            [
-                i
-                for i in self.schedule.agents
-                if i.agent_type == "Owner" and (i.get_my_house() != None)
-            ],
-            int(self.ExitRate * n_owners / 100),
+            owner_occupiers,
+            min(int(self.ExitRate * n_owners / 100), len(owner_occupiers)),
         )
 
         for owners in owners_house_on_market:
             my_house = owners.get_my_house()
             my_house.put_on_market(self.current_step)
             my_house.set_owner(None)
-            self.uniqueIDs.remove(owners.get_owner_id())
             self.kill_agents(owners)
 
         # Some new owners arrive!
@@ -525,31 +506,59 @@ class MesaModel(Model):
         """
         if self.maxHomelessPeriod > 0:
             # ; after this number of periods, the homeless emigrate
-            for agents in self.schedule.agents:
-                if agents.agent_type == "Owner":
-                    if not agents.get_my_house():
-                        agents.set_homeless(agents.get_homeless() + 1)
-                        if agents.get_homeless() > self.maxHomelessPeriod:
-                            self.uniqueIDs.remove(agents.get_owner_id())
-                            self.kill_agents_not_on_grid(agents)
+            homeless_owners = self.registry.in_schedule_order(
+                self.registry.homeless_owners
+            )
+            if self.vectorised_owners:
+                slots = self.owner_finance.slots_of(homeless_owners)
+                self.owner_finance.homeless[slots] += 1
+                emigrating = self.owner_finance.homeless[slots] > self.maxHomelessPeriod
+                for i in np.flatnonzero(emigrating):
+                    self.kill_agents_not_on_grid(homeless_owners[i])
+            else:
+                for agents in homeless_owners:
+                    agents.set_homeless(agents.get_homeless() + 1)
+                    if agents.get_homeless() > self.maxHomelessPeriod:
+                        self.kill_agents_not_on_grid(agents)
 
         """
         ; those who are paying mortgages greater than their income, are forced to move out
         ; of the housing market and their house is put up for sale
         """
 
-        for ownerOccupiers in owner_occupiers:
-            if (
-                (ownerOccupiers.get_my_house().is_house_for_sale() == True)
-                and (
-                    (ownerOccupiers.get_repayment() * self.TicksPerYear)
-                    > ownerOccupiers.get_income()
+        if self.vectorised_owners:
+            finance = self.owner_finance
+            slots = finance.slots_of(owner_occupiers)
+            for_sale = np.fromiter(
+                (owner.my_house.for_sale == True for owner in owner_occupiers),
+                dtype=bool,
+                count=len(owner_occupiers),
+            )
+            # owners who have left since the start of the step keep their slots,
+            # and are no longer live, until the end of the step.
+            forced_out = (
+                for_sale
+                & (
+                    finance.repayments_of(slots) * self.TicksPerYear
+                    > finance.incomes_of(slots)
                 )
-                and (ownerOccupiers.get_owner_id() in self.uniqueIDs)
-            ):
-                ownerOccupiers.get_my_house().set_owner(None)
-                self.uniqueIDs.remove(ownerOccupiers.get_owner_id())
-                self.kill_agents(ownerOccupiers)
+                & finance.live[slots]
+            )
+            for i in np.flatnonzero(forced_out):
+                owner_occupiers[i].get_my_house().set_owner(None)
+                self.kill_agents(owner_occupiers[i])
+        else:
+            for ownerOccupiers in owner_occupiers:
+                if (
+                    (ownerOccupiers.get_my_house().is_house_for_sale() == True)
+                    and (
+                        (ownerOccupiers.get_repayment() * self.TicksPerYear)
+                        > ownerOccupiers.get_income()
+                    )
+                    and self.unique_ids.is_live(ownerOccupiers.get_owner_id())
+                ):
+                    ownerOccupiers.get_my_house().set_owner(None)
+                    self.kill_agents(ownerOccupiers)
 
         # ; some new houses are built, and put up for sale
         num_houses = self.get_number_of_agents("House")
@@ -561,36 +570,16 @@ class MesaModel(Model):
             if self.grid.exists_empty_cells():
                 self.build_house(self.get_new_id())
 
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                if houses.get_quality() == 0:
-                    """
-                    ; these are the new houses
-                    ; calculate quality index as the mean of the qualities of those in the locality
-                    ; or set to 1 if there aren't any houses around here
-                    """
-                    # num for num in inputList if num != 0
-                    houses_around_here = [
-                        i
-                        for i in self.grid.get_neighbors(
-                            pos=houses.pos, moore=True, radius=self.Locality
-                        )
-                        if i.agent_type == "House"
-                    ]
-                    quality_index_of_houses_here = []
-                    for house in houses_around_here:
-                        quality_index_of_houses_here.append(house.get_quality())
-
-                    if len(houses_around_here) > 0:
-                        houses.set_quality_index(np.mean(quality_index_of_houses_here))
-                    else:
-                        houses.set_quality_index(1)
-
-                    if houses.get_quality() > 3:
-                        houses.set_quality_index(3)
-
-                    if houses.get_quality() < 0.3:
-                        houses.set_quality_index(0.3)
+        """
+        ; these are the new houses
+        ; calculate quality index as the mean of the qualities of those in the locality
+        ; or set to 1 if there aren't any houses around here
+        """
+        new_houses = self.registry.in_schedule_order(self.registry.unrated_houses)
+        if len(new_houses) > 0:
+            qualities = self.rate_new_houses(new_houses)
+            for houses, quality in zip(new_houses, qualities):
+                houses.set_quality_index(quality)
 
         """
         ; for houses that are newly for sale, get the sale price, which is the highest
@@ -615,58 +604,49 @@ class MesaModel(Model):
             set medianPriceOfHousesForSale median [sale-price] of houses-for-sale
             ]
         """
-        houses_for_sale = [
-            i
-            for i in self.schedule.agents
-            if i.agent_type == "House" and i.is_house_for_sale()
-        ]
-        list_of_houses = [i for i in self.schedule.agents if i.agent_type == "House"]
+        houses_for_sale = self.registry.in_schedule_order(self.registry.houses_for_sale)
 
         if len(houses_for_sale) > 0:
+            # the realtor chosen values the house as it did when it was chosen.
             for houses in houses_for_sale:
                 if houses.get_date_for_sale() == self.current_step:
-                    houses.set_realtor_valuation(list_of_houses)
-                    houses.set_sale_price(
-                        houses.get_my_realtor().valuation(houses, list_of_houses)
-                    )
+                    houses.set_realtor_valuation()
+                    houses.set_sale_price(houses.get_my_realtor().valuation(houses))
+                    self.valuation_cache.repriced(houses)
 
             # ; update the average selling price of houses in each realtor's territory
-            _realtors = [i for i in self.schedule.agents if i.agent_type == "Realtor"]
-            for realtors in _realtors:
-                my_houses_for_sale = [
-                    i
-                    for i in houses_for_sale
-                    if realtors in i.get_list_of_local_realtors()
-                ]
-                if len(my_houses_for_sale) > 0:
-                    realtors.set_realtor_average_price(my_houses_for_sale)
+            for realtors in self.registry.realtors.values():
+                if len(realtors.get_realtor_houses()) > 0:
+                    realtors.set_realtor_average_price()
 
             self.medianPriceOfHousesForSale = self.get_median_house_sale_price_list(
                 houses_for_sale
             )
 
         #  ; buyers (new entrants and those wishing to sell) search for a suitable property to buy
-        buyers = [
-            i
-            for i in self.schedule.agents
-            if i.agent_type == "Owner"
-            and (i.get_my_house() == None or i.get_my_house().is_house_for_sale())
-        ]
+        sellers = {}
+        for houses in self.registry.houses_for_sale.values():
+            if houses.get_owner() != None:
+                sellers[self.registry.sequence_of(houses.get_owner())] = (
+                    houses.get_owner()
+                )
+        buyers = self.registry.in_schedule_order(
+            {**self.registry.homeless_owners, **sellers}
+        )
+        homeless_buyers = self.registry.in_schedule_order(self.registry.homeless_owners)
+        selling_buyers = self.registry.in_schedule_order(sellers)
+
+        # The houses open to offers, by price; a house leaves it once offered on.
+        self.houses_by_price = PriceIndex(houses_for_sale)
 
         # ;; those with nothing to sell get priority in making an offer; i.e. they go first
-        for agents in self.schedule.agents:
-            if agents.agent_type == "Owner":
-                if agents.get_my_house() == None:
-                    agents.make_offer(houses_for_sale, self.current_step)
+        for agents in homeless_buyers:
+            agents.make_offer(self.houses_by_price, self.current_step)
 
         # ; and now those who do have a house to sell get a chance to make an offer
-        for agents in self.schedule.agents:
-            if agents.agent_type == "Owner":
-                if (
-                    agents.get_my_house() != None
-                    and agents.get_my_house().is_house_for_sale()
-                ):
-                    agents.make_offer(houses_for_sale, self.current_step)
+        for agents in selling_buyers:
+            if agents.get_my_house().is_house_for_sale():
+                agents.make_offer(self.houses_by_price, self.current_step)
 
         """
          ; Check which chains will complete.  A chain of buyers and sellers will complete only
@@ -675,39 +655,22 @@ class MesaModel(Model):
          ;  be vacant
         """
         self.moves = 0
-        for buyer in buyers:
-            if buyer.get_my_house() == None and buyer.get_made_offer() != None:
-                if buyer.follow_chain():
-                    # ; this buyer is the start of a successful chain
-                    # ; call in the removal firm!
-                    buyer.move_house(self, self.current_step, self.get_new_id())
+        for chain in self.find_completing_chains(buyers):
+            # ; this buyer is the start of a successful chain
+            # ; call in the removal firm!
+            for owner in chain:
+                owner.move_house(self, self.current_step)
 
         # ; realtors forget any sale records that are too old
-        outdated_records_stored = [
-            i
-            for i in self.schedule.agents
-            if i.agent_type == "Record"
-            and (int(i.get_record_date()) < int(self.current_step - self.RealtorMemory))
-        ]
-
-        for outdated_records in outdated_records_stored:
-            self.uniqueIDs.remove(outdated_records.get_record_ID())
-            self.kill_agents_not_on_grid(outdated_records)
-
-        # ; remove references to outdated records
-        for realtor in self.schedule.agents:
-            if realtor.agent_type == "Realtor":
-                for records in realtor.get_realtor_sales():
-                    if records in outdated_records_stored:
-                        realtor.remove_sales_from_list(records)
+        self.sales_ledger.expire(int(self.current_step - self.RealtorMemory))
 
         # ; cancel any outstanding offer
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                if houses.get_offered_to() != None:
-                    houses.get_offered_to().set_made_offer_on(None)
-                    houses.set_offered_to(None)
-                    houses.set_offer_date(0)
+        for houses in list(self.registry.houses_under_offer.values()):
+            houses.get_offered_to().set_made_offer_on(None)
+            houses.set_offered_to(None)
+            houses.set_offer_date(0)
+            if houses.get_for_sale():
+                self.houses_by_price.insert(houses)
 
         """
         ; demolish any house that is either at the end of its life or that is no longer
@@ -715,54 +678,55 @@ class MesaModel(Model):
         """
         self.nDemolished = 0
 
-        n_records = self.get_number_of_agents("Record")
+        n_records = len(self.sales_ledger)
 
         if n_records > 0:
             minimum_price = self.min_price_fraction * self.medianPriceOfHousesForSale
-            for houses in self.schedule.agents:
-                if houses.agent_type == "House" and (
-                    (self.current_step > houses.get_end_of_life())
-                    or (
-                        houses.get_for_sale()
-                        and houses.get_sale_price() < minimum_price
-                    )
+            for houses in self.houses_due_for_demolition(minimum_price):
+                if (self.current_step > houses.get_end_of_life()) or (
+                    houses.get_for_sale() and houses.get_sale_price() < minimum_price
                 ):
-                    houses.demolish(self.schedule.agents)
+                    houses.demolish()
                     # ; record the demolition
                     self.nDemolished += 1
-                    self.uniqueIDs.remove(houses.get_house_ID())
+                    self.house_index.remove(houses)
                     self.kill_agents(houses)
 
         # ; any house that is still for sale has its price reduced
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House" and (houses.get_for_sale()):
-                houses.set_sale_price(
-                    houses.get_sale_price() * (1 - self.PriceDropRate / 100)
-                )
+        # (counted once, each price is worked out when it is read)
+        self.house_state.decay(1 - self.PriceDropRate / 100)
 
         """
         ; owners that have a mortgage have to pay interest and some capital
         ; the mortgage is reduced by the amount of capital repayment
         """
-        for owners in self.schedule.agents:
-            if owners.agent_type == "Owner" and (
-                owners.get_my_house() != None and owners.get_mortgage() > 0
-            ):
-                owners.set_mortgage(
-                    owners.get_mortgage()
-                    - (
-                        owners.get_repayment()
-                        - self.interestPerTick * owners.get_mortgage()
+        if self.vectorised_owners:
+            # counted once, each mortgage is worked out when it is read
+            self.owner_finance.charge_interest(self.interestPerTick)
+        else:
+            for owners in self.registry.owner_occupiers.values():
+                if owners.get_mortgage() > 0:
+                    owners.set_mortgage(
+                        owners.get_mortgage()
+                        - (
+                            owners.get_repayment()
+                            - self.interestPerTick * owners.get_mortgage()
+                        )
                     )
-                )
-                # ; check if mortgage has now been fully repaid; if so cancel it
-                if owners.get_mortgage() <= 0:
-                    owners.set_mortgage(0)
-                    owners.set_repayment(0)
+                    # ; check if mortgage has now been fully repaid; if so cancel it
+                    if owners.get_mortgage() <= 0:
+                        owners.set_mortgage(0)
+                        owners.set_repayment(0)
 
         # Keep track of the current scheduler step. current_step = ticks
         self.current_step += 1
 
+        # The slots of the owners who left during the step can now be reused.
+        self.owner_finance.recycle()
+        self.house_state.recycle()
+        # prices have dropped and houses gone since the valuations were made.
+        self.valuation_cache.clear()
+
         # Shocks to the market at a specific timestep.
         if self.current_step == int(self.intervention_step):
             if self.scenario == "ratefall":
@@ -773,48 +737,204 @@ class MesaModel(Model):
                 self.EntryRate = 10
             elif self.scenario == "poorentrants":
                 self.MeanIncome = 24000
-            elif self.scenario == "none":
-                print()
 
         # Stop if no owners or houses left!
         if self.get_number_of_agents("Owner") <= 0:
-            print("Finished: no remaining people!")
-            sys.exit()
+            self.stop("no remaining people")
+        elif self.get_number_of_agents("House") <= 0:
+            self.stop("no remaining houses")
+
+    def stop(self, reason):
+        # stop the run without ending the process, so that a batch of runs carries on;
+        # the callers report the reason.
+        self.running = False
+        self.termination_reason = reason
+        self.termination_step = self.current_step
+
+    def vectorised_income_shocks(self, owner_occupiers, upshocked, downshocked):
+        """
+        The income shocks, and the owner-occupiers they make want to move up or
+        down, worked out on the owners' finance arrays.
+        """
+        finance = self.owner_finance
+        slots = finance.slots_of(owner_occupiers)
+        up = finance.slots_of(upshocked)
+        finance.set_incomes(up, finance.incomes_of(up) * 1.2)
+        down = finance.slots_of(downshocked)
+        finance.set_incomes(down, finance.incomes_of(down) * 0.8)
+
+        houses = [owner.get_my_house() for owner in owner_occupiers]
+        not_for_sale = np.fromiter(
+            (house.for_sale == False for house in houses),
+            dtype=bool,
+            count=len(houses),
+        )
+        ratio = (
+            finance.repayments_of(slots) * self.TicksPerYear / finance.incomes_of(slots)
+        )
+        """
+        ; if they are now spending less than half the Affordability ratio of their
+        ; income on their mortgage repayments, they want to move up
+        ; if they are now spending more than twice the Affordability ratio of
+        ; their income on their mortgage repayments, they want to move down
+        """
+        moving_up = not_for_sale & (ratio < self.Affordability / 200)
+        moving_down = not_for_sale & (ratio > self.Affordability / 50)
+
+        for i in np.flatnonzero(moving_up | moving_down):
+            houses[i].put_on_market(self.current_step)
+        self.nUpShocked = int(np.count_nonzero(moving_up))
+        self.nDownShocked = int(np.count_nonzero(moving_down))
 
-        if self.get_number_of_agents("House") <= 0:
-            print("Finished: no remaining houses!")
-            sys.exit()
+    def rate_new_houses(self, new_houses):
+        """
+        The quality indexes of the new houses, read from the box-filter sums of the
+        quality and present layers around their cells.
+
+        As in NetLogo the new houses are rated one after the other, and a new house
+        counts the quality of the new houses around it rated before it, so once a
+        new house is rated its quality is added to the sums around its cell.
+        """
+        layers = self.grid_layers
+        layers.refresh("present", "quality")
+        # the new houses are on the layers, not yet rated (quality 0).
+        quality_around = layers.local_sum(layers.quality, self.Locality)
+        houses_around = layers.local_sum(layers.present, self.Locality)
+
+        qualities = []
+        for houses in new_houses:
+            if houses_around[houses.pos] > 0:
+                quality = quality_around[houses.pos] / houses_around[houses.pos]
+                quality = min(max(quality, 0.3), 3)
+            else:
+                # or 1 if there aren't any houses around here
+                quality = 1
+            layers.add_around(quality_around, houses.pos, self.Locality, quality)
+            layers.quality[houses.pos] = quality
+            qualities.append(quality)
+        return qualities
 
     def update_owner_occupiers(self):
         # let owner-occupiers owners with [ is-house? my-house ]
-        owner_occupiers = []
-        for agents in self.schedule.agents:
-            if agents.agent_type == "Owner":
-                if agents.get_my_house() != None:
-                    owner_occupiers.append(agents)
-
-        return owner_occupiers
+        return self.registry.in_schedule_order(self.registry.owner_occupiers)
 
     def get_new_id(self):
-        list_of_ids = sorted(self.uniqueIDs)
-        self.uniqueIDs.append(max(list_of_ids) + 1)
-        return max(list_of_ids) + 1
+        return self.unique_ids.new_id()
 
     def make_owners(self, n, timestep):
+        new_owners = []
         for i in range(n):
-            new_owner = Owner(self.total_number_of_agents, None, self)
-            self.schedule.add(new_owner)
+            new_owner = Owner(self.get_new_id(), None, self)
+            self.add_agent(new_owner)
             # self.grid.place_agent(new_owner, house.pos)
             # new owners are not located anywhere yet.
-            new_owner.assign_income(timestep)
-            self.total_number_of_agents = self.get_new_id()
+            new_owners.append(new_owner)
+
+        # assign-income, to all the new owners at once.
+        incomes = self.sample_incomes(n, timestep)
+        slots = self.owner_finance.slots_of(new_owners)
+        self.owner_finance.set_incomes(slots, incomes)
+        self.owner_finance.capital[slots] = incomes * self.Savings / 100
+
+    def sample_incomes(self, n, timestep):
+        return sample_incomes(
+            n, self.MeanIncome, self.Inflation, self.TicksPerYear, timestep
+        )
+
+    def find_completing_chains(self, buyers):
+        """
+        ;; Find the end of the chain which has my house as a link:
+        ;;   find the house I have made an offer for (If none, this chain fails; Stop)
+        ;;   find the current owner of that house (If none, this is a successful chain; Stop )
+        ;;   find the house they made an offer for ...
+        ;; continue until the seller of that house is the first buyer.
+        ;;   This is a successful chain; Stop
+
+        The offer graph (buyer -> house offered on -> its seller) is built once and
+        every chain is walked iteratively, each owner at most once, remembering
+        whether the chain through them completes. Returns the completing chains,
+        each as the list of owners in the order they move: the first buyer, then
+        the seller of the house they are buying, and so on.
+        """
+        offers = {}
+        for buyer in buyers:
+            if buyer.get_made_offer() != None:
+                offers[buyer] = buyer.get_made_offer().get_owner()
+
+        completes = {}
+        chains = []
+        for buyer in buyers:
+            if buyer.get_my_house() != None or buyer not in offers:
+                continue
+
+            chain = [buyer]
+            on_chain = {buyer}
+            link = buyer
+            while True:
+                if link not in offers:
+                    outcome = False
+                    break
+
+                seller = offers[link]
+                if seller == None:
+                    outcome = True
+                    break
+                if seller in completes:
+                    outcome = completes[seller]
+                    break
+                if seller in on_chain:
+                    # ; a cycle only completes if it comes back to the first buyer
+                    outcome = seller == buyer
+                    break
+
+                chain.append(seller)
+                on_chain.add(seller)
+                link = seller
+
+            for link in chain:
+                completes[link] = outcome
+            if outcome:
+                chains.append(chain)
+
+        return chains
+
+    def houses_due_for_demolition(self, minimum_price):
+        """
+        Get, in schedule order, the houses which may have to be demolished: those
+        past their end of life, taken off the end of life queue, and those for sale
+        at less than minimum_price, the cheapest of the houses for sale by price.
+        Only these houses need to be checked rather than all of them.
+        """
+        due = {}
+        queue = self.end_of_life_queue
+        while len(queue) > 0 and queue[0][0] < self.current_step:
+            end_of_life, unique_id, houses = heapq.heappop(queue)
+            # houses demolished for their price are left in the queue until due.
+            if self.unique_ids.is_live(unique_id):
+                due[self.registry.sequence_of(houses)] = houses
+
+        for houses in self.houses_by_price.below(minimum_price):
+            if self.unique_ids.is_live(houses.get_house_ID()):
+                due[self.registry.sequence_of(houses)] = houses
+
+        return self.registry.in_schedule_order(due)
+
+    def add_agent(self, agent):
+        self.schedule.add(agent)
+        self.registry.add(agent)
 
     def kill_agents(self, agent):
         self.grid.remove_agent(agent)
-        self.schedule.remove(agent)
+        self.kill_agents_not_on_grid(agent)
 
     def kill_agents_not_on_grid(self, agent):
         self.schedule.remove(agent)
+        self.registry.remove(agent)
+        self.unique_ids.release(agent.unique_id)
+        if agent.agent_type == "Owner":
+            self.owner_finance.release(agent.slot)
+        elif agent.agent_type == "House":
+            self.house_state.release(agent.slot)
 
     def create_records(self):
         """
@@ -837,40 +957,22 @@ class MesaModel(Model):
              ask my-realtor [ file-record the-record ]
              ]
         """
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                r = Records(
-                    self.total_number_of_agents,
-                    houses,
-                    houses.get_sale_price(),
-                    self.current_step,
-                    self,
-                )
-                self.schedule.add(r)
-
-                houses.set_realtor()
-                my_realtor = houses.get_my_realtor()
-                my_realtor.file_record(r)
-                self.total_number_of_agents = self.get_new_id()
+        for houses in self.registry.houses.values():
+            houses.set_realtor()
+            my_realtor = houses.get_my_realtor()
+            my_realtor.file_record(houses, houses.get_sale_price(), self.current_step)
 
     def get_number_of_agents(self, agentType):
-        x = 0
-        for agents in self.schedule.agents:
-            if agents.agent_type == agentType:
-                x += 1
+        return self.registry.count(agentType)
 
-        return x
+    def get_house(self, house_id):
+        return self.registry.get(house_id)
 
     def set_average_house_prices_for_realtors(self):
-        houses_list = []
-
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                houses_list.append(houses)
+        houses_list = list(self.registry.houses.values())
 
-        for realtors in self.schedule.agents:
-            if realtors.agent_type == "Realtor":
-                realtors.set_realtor_average_price(houses_list)
+        for realtors in self.registry.realtors.values():
+            realtors.set_realtor_average_price(houses_list)
 
     """
     ask houses [
@@ -881,51 +983,43 @@ class MesaModel(Model):
       """
 
     def calculate_quality_index(self):
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                houses.set_quality_index(
-                    houses.get_sale_price() / self.medianPriceOfHousesForSale
-                )
-                if houses.get_quality() > 3:
-                    houses.set_quality_index(3)
-                if houses.get_quality() < 0.3:
-                    houses.set_quality_index(0.3)
+        for houses in self.registry.houses.values():
+            houses.set_quality_index(
+                houses.get_sale_price() / self.medianPriceOfHousesForSale
+            )
+            if houses.get_quality() > 3:
+                houses.set_quality_index(3)
+            if houses.get_quality() < 0.3:
+                houses.set_quality_index(0.3)
 
     def create_owners(self):
         # create the owners, one per house
         # let occupied-houses n-of ((1 - initialVacancyRate) * count houses) houses
         occupied_houses = []
-        number_of_houses = 0
-        houses_list = []
-        counter = 0
+        houses_list = list(self.registry.houses.values())
 
-        for agent in self.schedule.agents:
-            if agent.agent_type == "House":
-                number_of_houses += 1
-                houses_list.append(agent)
-
-        number_of_houses = int((1 - self.initialVacancyRate) * number_of_houses)
+        number_of_houses = int((1 - self.initialVacancyRate) * len(houses_list))
 
         occupied_houses = random.sample(houses_list, number_of_houses)
+        incomes = self.sample_incomes(len(occupied_houses), self.current_step)
 
-        self.total_number_of_agents = self.get_new_id()
-        for house in occupied_houses:
+        for house, income in zip(occupied_houses, incomes):
             house.set_for_sale(False)
 
-            new_owner = Owner(self.total_number_of_agents, house, self)
+            new_owner = Owner(self.get_new_id(), house, self)
             # Add the object to the scheduler
-            self.schedule.add(new_owner)
+            self.add_agent(new_owner)
             self.grid.place_agent(new_owner, house.pos)
             house.set_owner(new_owner)
 
             # assign-income
-            new_owner.assign_income(self.current_step)
+            new_owner.assign_income(self.current_step, income)
 
             # if InitialGeography = "Gradient" [ set income income * ( xcor + ycor + 50) / 50 ]
             if self.InitialGeography == "Gradient":
                 new_owner.set_income(
                     new_owner.get_income()
-                    * (new_owner.pos.x + new_owner.pos.y + 50)
+                    * (new_owner.pos[0] + new_owner.pos[1] + 50)
                     / 50
                 )
 
@@ -954,37 +1048,24 @@ class MesaModel(Model):
                 )
             )
 
-            self.total_number_of_agents = self.get_new_id()
-
     def build_house(self, id):  # observer procedure
         # ;; add a single house to the town, in a random location
 
         # Create a house object.
         a = House(id, self)
         # Add the object to the scheduler
-        self.schedule.add(a)
+        self.add_agent(a)
         # Place the agent on an empty cell within the grid.
         self.grid.place_agent(a, self.grid.find_empty())
+        self.house_index.insert(a, a.pos)
+        self.house_state.place(a.slot, a.pos)
 
-        # get the neighbouring cells in all 8 cardinal directions from origin up to < RealtorTerritory radius
-        neighbourhood_cells = self.grid.get_neighbors(
-            a.pos, moore=True, radius=self.RealtorTerritory - 1
-        )
-        # Get all realtor agents within the RealtorTerritory distance and add them to the houses local_realtors list
-        for agent in neighbourhood_cells:
-            if agent.agent_type == "Realtor":
-                a.set_local_realtors(agent)
-
-        # If there are some houses which do not fall within the realtors territory...
-        if len(a.get_list_of_local_realtors()) == 0:
-            realtors_distance = {}
-            # We add the realtor, euclidean distance key, value pair to a dictionary
-            # and select the smallest distance realtor to the house and add this to the local_realtor list.
-            for agent in self.schedule.agents:
-                if agent.agent_type == "Realtor":
-                    realtors_distance[agent] = int(self.calc_distance(a.pos, agent.pos))
-
-            a.set_local_realtors(min(realtors_distance, key=realtors_distance.get))
+        # Get all realtor agents within the RealtorTerritory distance (the neighbouring cells
+        # in all 8 cardinal directions up to < RealtorTerritory radius) and add them to the
+        # houses local_realtors list. If the house does not fall within any realtor's
+        # territory, the realtor at the smallest euclidean distance is added instead.
+        for agent in self.territory_map.local_realtors(a.pos):
+            a.set_local_realtors(agent)
 
         """
         ; initially empty houses are for sale
@@ -1001,64 +1082,52 @@ class MesaModel(Model):
             self.current_step
             + int(np.random.exponential(self.HouseMeanLifetime * self.TicksPerYear))
         )
+        heapq.heappush(self.end_of_life_queue, (a.get_end_of_life(), id, a))
 
     def get_visualisation_of_owner_income(self):
-        incomes = []
-        for agents in self.schedule.agents:
-            if agents.agent_type == "Owner":
-                incomes.append(agents.get_income())
+        incomes = [i.get_income() for i in self.registry.owners.values()]
 
         plt.hist(incomes)
         plt.show()
 
     def get_visualisation_of_owner_capital(self):
-        capital = []
-        for agents in self.schedule.agents:
-            if agents.agent_type == "Owner":
-                capital.append(agents.get_capital())
+        capital = [i.get_capital() for i in self.registry.owners.values()]
 
         plt.hist(capital)
         plt.show()
 
     def get_distribution_of_house_prices_all(self):
-        all_houses = [
-            i.get_sale_price() for i in self.schedule.agents if i.agent_type == "House"
-        ]
+        all_houses = [i.get_sale_price() for i in self.registry.houses.values()]
 
         plt.hist(all_houses)
         plt.show()
 
     def get_distribution_of_house_prices_for_sale(self):
         all_houses = [
-            i.get_sale_price()
-            for i in self.schedule.agents
-            if i.agent_type == "House" and (i.get_for_sale() == True)
+            i.get_sale_price() for i in self.registry.houses_for_sale.values()
         ]
 
         plt.hist(all_houses)
         plt.show()
 
     def get_median_house_sale_price(self):
-        list_of_house_prices = []
-        for houses in self.schedule.agents:
-            if houses.agent_type == "House":
-                if houses.get_sale_price() > 0:
-                    list_of_house_prices.append(houses.get_sale_price())
+        list_of_house_prices = self.house_state.prices_of(
+            self.house_state.slots_of(self.registry.houses.values())
+        )
 
-        return np.median(list_of_house_prices)
+        return np.median(list_of_house_prices[list_of_house_prices > 0])
 
     def get_median_house_sale_price_list(self, houses):
-        list_of_house_prices = []
-        for houses in houses:
-            list_of_house_prices.append(houses.get_sale_price())
+        list_of_house_prices = self.house_state.prices_of(
+            self.house_state.slots_of(houses)
+        )
 
         return np.median(list_of_house_prices)
 
     def debug(self, agent_type):
         # DEBUGGING.
-        for agent in self.schedule.agents:
-            if agent.agent_type == agent_type:
-                print(agent.get_records())
+        for agent in self.registry.of_type(agent_type).values():
+            print(agent.get_records())
 
     # euclidean distance.
     def calc_distance(self, p1, p2):
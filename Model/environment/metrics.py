@@ -0,0 +1,145 @@
+"""The MarketMetrics object
+Description:
+    Computes every statistic plotted by the model (the DataCollector's model
+    reporters) in one go. The columns the statistics need (incomes, repayments,
+    mortgages, the prices of the owners' houses, the prices and dates of the houses
+    for sale) are taken straight from the model's OwnerFinance and HouseState
+    arrays, and the statistics are then worked out with NumPy.
+
+    The values are kept while the DataCollector collects, the model clearing them
+    on either side of its collect() call, so the reporter functions registered
+    with the DataCollector only read them and the same labels still feed the
+    charts of main_visualisation.py. A reporter called at any other time measures
+    the model as it is then.
+"""
+
+import numpy as np
+
+
+def gini(values):
+    """
+    The gini index of a sample, computed as in the original NetLogo model:
+
+    let sorted-wealths sort [wealth] of turtles
+    let total-wealth sum sorted-wealths
+    let wealth-sum-so-far 0
+    let index 0
+    let gini-index-reserve 0
+    repeat count turtles [
+        set wealth-sum-so-far (wealth-sum-so-far + item index sorted-wealths)
+        set index (index + 1)
+        set gini-index-reserve gini-index-reserve + (index / count turtles) -
+            (wealth-sum-so-far / total-wealth)
+    ]
+    """
+    sorted_values = np.sort(np.asarray(values, dtype=np.float64))
+    items = len(sorted_values)
+    sum_so_far = np.cumsum(sorted_values)
+    index = np.arange(1, items + 1)
+    gini_index = np.sum(index / items - sum_so_far / sum_so_far[-1])
+
+    # only accurate if items is large
+    return 2 * (gini_index / items)
+
+
+class MarketMetrics:
+    """
+    A class computing the statistics reported by the model's DataCollector.
+
+    Parameters:
+    model (MesaModel): The model to measure.
+
+    Methods:
+    get(name):
+        Get a statistic, by the name of its reporter function, measuring the
+        model first if it has changed since it was last measured.
+
+    measure():
+        Compute all the statistics of the model as it is now.
+
+    clear():
+        Forget the statistics, the model is about to change.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.values = None
+
+    def get(self, name):
+        if self.values == None:
+            self.values = self.measure()
+        return self.values[name]
+
+    def clear(self):
+        self.values = None
+
+    def measure(self):
+        model = self.model
+        registry = model.registry
+
+        # the owners: their finances are columns of the model's OwnerFinance.
+        finance = model.owner_finance
+        n_owners = len(registry.owners)
+        slots = finance.slots_of(registry.owners.values())
+        incomes = finance.incomes_of(slots)
+        repayments = finance.repayments_of(slots)
+
+        # the houses: their state is held in columns of the model's HouseState.
+        state = model.house_state
+        occupiers = registry.owner_occupiers.values()
+        house_prices = state.prices_of(
+            state.slots_of([owner.my_house for owner in occupiers])
+        )
+        mortgages = finance.mortgages_of(finance.slots_of(occupiers))
+        n_negative_equity = int(np.count_nonzero(house_prices < mortgages))
+
+        # the houses for sale which have been given a price.
+        for_sale = state.slots_of(registry.houses_for_sale.values())
+        dates_for_sale = state.date_for_sale[for_sale][state.prices_of(for_sale) > 0]
+
+        sold_prices = model.sales_ledger.prices()
+
+        values = {
+            "count_houses": registry.count("House"),
+            "count_people_seeking_home": len(registry.homeless_owners),
+            "count_empty_houses": len(registry.vacant_houses),
+            "ve_equity": n_negative_equity,
+            "demolished": model.nDemolished,
+            "people": n_owners,
+            "up_shocked": 10 * model.nUpShocked,
+            "down_shocked": 10 * model.nDownShocked,
+            "median_house_prices_for_sale": 0,
+            "median_house_prices_for_sold": 0,
+            "gini_index_prices": None,
+            "gini_index_incomes": None,
+            "mortgage_repayment_income": None,
+            "median_house_prices": None,
+            "median_time_on_market": np.nan,
+            "transactions": model.moves,
+            "interest_rate": model.interestPerTick * model.TicksPerYear * 100,
+            "inflation_rate": model.Inflation,
+        }
+
+        if len(dates_for_sale) > 0:
+            values["median_house_prices_for_sale"] = model.medianPriceOfHousesForSale
+            values["median_time_on_market"] = model.current_step - np.median(
+                dates_for_sale
+            )
+
+        if len(sold_prices) > 0:
+            median_sold = np.median(sold_prices)
+            values["median_house_prices_for_sold"] = median_sold
+            values["gini_index_prices"] = gini(sold_prices)
+            if n_owners > 0:
+                values["median_house_prices"] = median_sold / np.median(incomes)
+
+        if n_owners > 0:
+            values["gini_index_incomes"] = gini(incomes)
+
+        paying = repayments > 0
+        if paying.any():
+            values["mortgage_repayment_income"] = model.TicksPerYear * (
+                np.mean(repayments[paying]) / np.mean(incomes[paying])
+            )
+
+        return values
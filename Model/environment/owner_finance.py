@@ -0,0 +1,188 @@
+"""The OwnerFinance object
+Description:
+    The finances of the owners (income, mortgage, repayment, capital and the number
+    of periods spent homeless) held as NumPy arrays, one slot per owner, instead of
+    as attributes of each Owner object. The Owner attributes and their getters and
+    setters read and write the owner's slot, so an owner still looks the same to the
+    rest of the model, while the model's owner phases (inflation, income shocks, the
+    affordability checks, the homeless count and the mortgage repayments) can work
+    on the owners' columns all at once.
+
+    Inflation and mortgage repayments are not applied to every owner every tick.
+    An income is kept as the income it was last set to (drawn, shocked) and the
+    number of ticks of inflation counted by then, and is worked out when read as
+
+        income * (1 + Inflation / (TicksPerYear * 100)) ^ (ticks of inflation since)
+
+    A mortgage is kept as the balance it was last set to (on a purchase, a sale,
+    a demolition), with the repayment, and is worked out when read from two running
+    figures over the ticks of repayments: the growth G, the product of (1 + the
+    interest rate per tick) of the ticks, and D, the sum of 1 / G after each tick.
+    Paying R a tick from a balance M set when they were G0 and D0 leaves
+
+        G * (M / G0 - R * (D - D0))
+
+    which follows the interest rate however it has changed (cycles, the ratefall
+    scenario). Once that is no more than 0 the mortgage has been paid off: it reads
+    0, and so does the repayment. A tick of inflation or repayments updates these
+    running figures only, so costs the same whatever the number of owners.
+"""
+
+from environment.slot_arrays import SlotArrays
+import numpy as np
+
+
+class OwnerFinance(SlotArrays):
+    """
+    A class holding the finances of the owners in NumPy arrays, indexed by slot.
+
+    Parameters:
+    capacity (int): Initial number of slots, doubled whenever they are all in use.
+
+    Attributes:
+    income, mortgage, repayment (numpy.ndarray): The values last set, worked out
+        from (with the columns below) when read.
+    inflated (numpy.ndarray): The ticks of inflation counted when income was set.
+    growth, discount (numpy.ndarray): The running growth and discount of the
+        repayments when mortgage was set.
+    capital, homeless (numpy.ndarray): The columns.
+    live (numpy.ndarray): Whether a slot belongs to an owner in the model.
+
+    Methods:
+    inflate(factor):
+        Raise the incomes of all owners by factor.
+
+    charge_interest(rate):
+        Take a tick of mortgage repayments from all owners, at an interest rate per
+        tick.
+
+    income_of(slot), incomes_of(slots):
+        Get the current income of one owner, or of some owners as an array.
+
+    mortgage_of(slot), mortgages_of(slots), repayment_of(slot), repayments_of(slots):
+        Get the current mortgage or repayment of one owner, or of some owners.
+
+    set_income(slot, income), set_incomes(slots, incomes):
+        Set the income of one owner, or of some owners.
+
+    set_mortgage(slot, mortgage), set_repayment(slot, repayment),
+    set_loans(slots, mortgages, repayments):
+        Set the mortgage or repayment of one owner, or both of some owners.
+    """
+
+    COLUMNS = {
+        "income": (np.float64, 0),
+        "inflated": (np.int64, 0),
+        "mortgage": (np.float64, 0),
+        "repayment": (np.float64, 0),
+        "growth": (np.float64, 1),
+        "discount": (np.float64, 0),
+        "capital": (np.float64, 0),
+        "homeless": (np.int64, 0),
+    }
+
+    # the running growth is brought back to 1 before it could overflow.
+    MAX_GROWTH = 1e100
+
+    def __init__(self, capacity=1024):
+        super().__init__(capacity)
+        self._inflated = 0
+        self._factor = 1.0
+        self._growth = 1.0
+        self._discount = 0.0
+
+    def allocate(self):
+        slot = super().allocate()
+        self.inflated[slot] = self._inflated
+        self.growth[slot] = self._growth
+        self.discount[slot] = self._discount
+        return slot
+
+    def _allocated(self):
+        # the slots of owners who left during the step are still read until its end.
+        return np.arange(self._next_slot)
+
+    def inflate(self, factor):
+        if factor != self._factor:
+            slots = self._allocated()
+            self.set_incomes(slots, self.incomes_of(slots))
+            self._factor = factor
+        self._inflated += 1
+
+    def charge_interest(self, rate):
+        self._growth = self._growth * (1 + rate)
+        self._discount = self._discount + 1 / self._growth
+        if self._growth > self.MAX_GROWTH:
+            slots = self._allocated()
+            mortgages = self.mortgages_of(slots)
+            repayments = self.repayments_of(slots)
+            self._growth = 1.0
+            self._discount = 0.0
+            self.set_loans(slots, mortgages, repayments)
+
+    def income_of(self, slot):
+        ticks = self._inflated - self.inflated.item(slot)
+        return self.income.item(slot) * self._factor**ticks
+
+    def incomes_of(self, slots):
+        ticks = self._inflated - self.inflated[slots]
+        return self.income[slots] * self._factor**ticks
+
+    def set_income(self, slot, income):
+        self.income[slot] = income
+        self.inflated[slot] = self._inflated
+
+    def set_incomes(self, slots, incomes):
+        self.income[slots] = incomes
+        self.inflated[slots] = self._inflated
+
+    def _balances(self, slots):
+        # only a mortgage still being paid off changes, from the tick after it is set.
+        mortgage = self.mortgage[slots]
+        paying = (mortgage > 0) & (self.discount[slots] != self._discount)
+        balance = self._growth * (
+            mortgage / self.growth[slots]
+            - self.repayment[slots] * (self._discount - self.discount[slots])
+        )
+        # ; check if mortgage has now been fully repaid; if so cancel it
+        repaid = paying & (balance <= 0)
+        return np.where(paying, np.where(repaid, 0, balance), mortgage), repaid
+
+    def mortgage_of(self, slot):
+        return self.mortgages_of(np.array([slot])).item(0)
+
+    def mortgages_of(self, slots):
+        return self._balances(slots)[0]
+
+    def repayment_of(self, slot):
+        return self.repayments_of(np.array([slot])).item(0)
+
+    def repayments_of(self, slots):
+        return np.where(self._balances(slots)[1], 0, self.repayment[slots])
+
+    def set_loans(self, slots, mortgages, repayments):
+        self.mortgage[slots] = mortgages
+        self.repayment[slots] = repayments
+        self.growth[slots] = self._growth
+        self.discount[slots] = self._discount
+
+    def set_mortgage(self, slot, mortgage):
+        self.set_loans(slot, mortgage, self.repayment_of(slot))
+
+    def set_repayment(self, slot, repayment):
+        self.set_loans(slot, self.mortgage_of(slot), repayment)
+
+    def get_state(self):
+        state = super().get_state()
+        state["inflations"] = np.array(self._inflated)
+        state["inflation_factor"] = np.array(self._factor)
+        state["running_growth"] = np.array(self._growth)
+        state["running_discount"] = np.array(self._discount)
+        return state
+
+    def set_state(self, state):
+        super().set_state(state)
+        self._inflated = int(state["inflations"])
+        self._factor = float(state["inflation_factor"])
+        self._growth = float(state["running_growth"])
+        self._discount = float(state["running_discount"])
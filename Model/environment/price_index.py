@@ -0,0 +1,226 @@
+"""The PriceIndex object
+Description:
+    The houses for sale ordered by their sale price. Buyers look for a house in a
+    price band, between 70% of what they can afford and what they can afford, so
+    rather than every buyer filtering every house for sale the houses in the band
+    are found by bisecting the sorted prices, and a buyer's search only looks at
+    the (at most) BuyerSearchLength houses drawn from the band.
+
+    A house is taken out of the index as soon as an offer is made on it, as a house
+    can only be under offer to one buyer at a time, so the houses left in the index
+    are always the ones still open to offers. The prices of the houses must not
+    change while they are indexed.
+
+    The houses are kept in sorted blocks of a few hundred, with the highest price of
+    each block, as in a B-tree of one level: a house is found, inserted or removed
+    by bisecting the blocks and then its block, so an update costs O(log n) plus
+    shifting one block (at most 2 * LOAD houses), not the whole index. The sizes
+    of the blocks are kept in a Fenwick tree, so the position of a house and the
+    house at a position, to draw from a band, are found in O(log n) too.
+"""
+
+from bisect import bisect_left, bisect_right
+import random
+
+
+class PriceIndex:
+    """
+    A class holding houses sorted by their sale price.
+
+    Parameters:
+    houses (list): The houses to index. Houses with the same price are kept in the
+    order they are given.
+
+    Methods:
+    insert(house):
+        Add a house to the index, after any house with the same price.
+
+    remove(house):
+        Remove a house from the index, if it is indexed.
+
+    sample_band(lowerbound, upperbound, k, exclude=None):
+        Get up to k houses drawn at random from those with a price above lowerbound
+        and no more than upperbound, leaving out the house exclude.
+
+    below(price):
+        Get the houses with a price less than price, cheapest first.
+    """
+
+    # the houses are held in blocks of up to 2 * LOAD, so that an insertion or a
+    # removal only shifts one block rather than the whole index.
+    LOAD = 500
+
+    def __init__(self, houses=()):
+        houses = sorted(houses, key=lambda house: house.get_sale_price())
+        prices = [house.get_sale_price() for house in houses]
+        self._houses = [
+            houses[i : i + self.LOAD] for i in range(0, len(houses), self.LOAD)
+        ]
+        self._prices = [
+            prices[i : i + self.LOAD] for i in range(0, len(prices), self.LOAD)
+        ]
+        # the highest price in each block, to bisect for the block of a price.
+        self._maxes = [block[-1] for block in self._prices]
+        self._size = len(houses)
+        self._tree = None
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, house):
+        return self._find(house) != None
+
+    def _build_tree(self):
+        # a Fenwick tree of the block sizes, for the position of a block and the
+        # block of a position; built again only when blocks are split or dropped.
+        self._tree = [0] + [len(prices) for prices in self._prices]
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+        self._top_bit = 1 << (len(self._tree) - 1).bit_length() >> 1
+
+    def _count(self, block, change):
+        if self._tree == None:
+            return
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += change
+            i += i & -i
+
+    def _offset(self, block):
+        # the number of houses in the blocks before block.
+        if self._tree == None:
+            self._build_tree()
+        offset = 0
+        i = block
+        while i > 0:
+            offset += self._tree[i]
+            i -= i & -i
+        return offset
+
+    def _bisect(self, price, right):
+        # the position at which price would be inserted, before (or, if right,
+        # after) any houses with the same price.
+        if right:
+            block = bisect_right(self._maxes, price)
+        else:
+            block = bisect_left(self._maxes, price)
+        if block == len(self._maxes):
+            return self._size
+        if right:
+            within = bisect_right(self._prices[block], price)
+        else:
+            within = bisect_left(self._prices[block], price)
+        return self._offset(block) + within
+
+    def _at(self, position):
+        if self._tree == None:
+            self._build_tree()
+        # walk down the tree to the block with position houses before its house.
+        block = 0
+        bit = self._top_bit
+        while bit > 0:
+            if block + bit < len(self._tree) and self._tree[block + bit] <= position:
+                block += bit
+                position -= self._tree[block]
+            bit >>= 1
+        return self._houses[block][position]
+
+    def _find(self, house):
+        # the block and place within it of house, among the houses of its price.
+        price = house.get_sale_price()
+        block = bisect_left(self._maxes, price)
+        if block == len(self._maxes):
+            return None
+        within = bisect_left(self._prices[block], price)
+        while block < len(self._prices):
+            if within == len(self._prices[block]):
+                block += 1
+                within = 0
+            elif self._prices[block][within] != price:
+                return None
+            elif self._houses[block][within] is house:
+                return block, within
+            else:
+                within += 1
+        return None
+
+    def insert(self, house):
+        price = house.get_sale_price()
+        self._size += 1
+        if len(self._maxes) == 0:
+            self._houses.append([house])
+            self._prices.append([price])
+            self._maxes.append(price)
+            self._tree = None
+            return
+
+        block = min(bisect_right(self._maxes, price), len(self._maxes) - 1)
+        prices = self._prices[block]
+        houses = self._houses[block]
+        within = bisect_right(prices, price)
+        prices.insert(within, price)
+        houses.insert(within, house)
+        self._maxes[block] = prices[-1]
+        self._count(block, 1)
+        if len(prices) > 2 * self.LOAD:
+            self._tree = None
+            self._prices[block : block + 1] = [prices[: self.LOAD], prices[self.LOAD :]]
+            self._houses[block : block + 1] = [houses[: self.LOAD], houses[self.LOAD :]]
+            self._maxes[block : block + 1] = [prices[self.LOAD - 1], prices[-1]]
+
+    def remove(self, house):
+        found = self._find(house)
+        if found == None:
+            return
+        block, within = found
+        del self._prices[block][within]
+        del self._houses[block][within]
+        if len(self._prices[block]) == 0:
+            del self._prices[block]
+            del self._houses[block]
+            del self._maxes[block]
+            self._tree = None
+        else:
+            self._maxes[block] = self._prices[block][-1]
+            self._count(block, -1)
+        self._size -= 1
+
+    def sample_band(self, lowerbound, upperbound, k, exclude=None):
+        first = self._bisect(lowerbound, right=True)
+        end = self._bisect(upperbound, right=True)
+        size = end - first
+
+        skipped = None
+        if exclude != None:
+            found = self._find(exclude)
+            if found != None:
+                skipped = self._offset(found[0]) + found[1]
+            if skipped != None and first <= skipped < end:
+                size -= 1
+            else:
+                skipped = None
+
+        if size > k:
+            picks = random.sample(range(size), k)
+        else:
+            picks = range(size)
+
+        band = []
+        for pick in picks:
+            position = first + pick
+            if skipped != None and position >= skipped:
+                position += 1
+            band.append(self._at(position))
+        return band
+
+    def below(self, price):
+        end = self._bisect(price, right=False)
+        houses = []
+        for block in self._houses:
+            if len(houses) + len(block) > end:
+                houses.extend(block[: end - len(houses)])
+                break
+            houses.extend(block)
+        return houses
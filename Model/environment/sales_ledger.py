@@ -0,0 +1,269 @@
+"""The SalesLedger object
+Description:
+    A columnar store of the house sales recorded by the realtors, replacing the
+    Records agents that used to be added to the scheduler for every sale. Each sale
+    is a row of typed NumPy columns (house id, x, y, price, tick, realtor id) in a
+    ring buffer; rows are appended in the order the sales are made, i.e. in tick
+    order, and the rows of each tick make up a bucket. Forgetting the sales older
+    than RealtorMemory drops the expired buckets, advancing the head of the buffer
+    past their rows without looking at the rows one by one.
+
+    A row is "filed" with the realtor that made the sale. Unfiling a row (the house
+    has been demolished) removes it from that realtor's records but, as with the
+    old Records agents, the sale still counts towards the market statistics until
+    it expires. The ledger keeps the rows held for each house and the rows filed
+    with each realtor, oldest first, so unfiling the records of a house only
+    touches the rows concerned, and a realtor's records are built from its own rows.
+    Expiry drops the expired rows from the front of each realtor's rows, and only
+    the views of the realtors whose rows have changed are built again. The median queries are vectorised
+    over a realtor's rows, and Records objects give the old per-record accessors on
+    top of a row.
+"""
+
+from agents.records import Records
+from collections import deque
+import numpy as np
+
+NO_REALTOR = -1
+COLUMNS = ("house_id", "x", "y", "price", "tick", "realtor_id")
+
+
+class SalesLedger:
+    """
+    A class holding the sales records of the model in a columnar ring buffer.
+
+    Parameters:
+    resolve_house: Callable returning the live house with a given id, or None.
+    capacity (int): Initial number of rows, doubled whenever the buffer is full.
+
+    Methods:
+    file(house, selling_price, date, realtor_id):
+        Append a sale to the ledger, filed with a realtor; returns its row.
+
+    unfile_row(row):
+        Remove a record from its realtor's records.
+
+    unfile_house(house_id, realtor_id=None):
+        Remove every record of a house from a realtor's (or every realtor's) records.
+
+    expire(before_tick):
+        Forget the sales made before a tick.
+
+    prices():
+        Get the selling prices of all sales held.
+
+    realtor_rows(realtor_id):
+        Get the rows filed with a realtor.
+
+    local_prices(realtor_id, pos, radius):
+        Get the prices of a realtor's sales of houses within radius of pos.
+
+    slot_of(row):
+        Get the position of a row in the columns.
+
+    is_live(row):
+        Check whether a row is still held (has not expired).
+
+    record(row):
+        Get a Records accessor for a row.
+
+    records(realtor_id):
+        Get the Records accessors of the rows filed with a realtor.
+
+    get_state():
+        Get the rows held and the ledger's bookkeeping, as arrays.
+
+    set_state(state):
+        Put back the rows and bookkeeping from get_state().
+    """
+
+    def __init__(self, resolve_house, capacity=1024):
+        self.resolve_house = resolve_house
+        self._allocate(max(1, int(capacity)))
+        self._head = 0  # row number of the oldest sale held
+        self._tail = 0  # row number the next sale will be given
+        self._house_rows = {}  # house id -> deque of its rows, oldest first
+        self._ticks = deque()  # [tick, first row] of each tick's bucket, oldest first
+        self._realtor_rows = {}  # realtor id -> deque of the rows filed with it
+        self._realtor_views = {}
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def _allocate(self, capacity):
+        self._capacity = capacity
+        self.house_id = np.zeros(capacity, dtype=np.int64)
+        self.x = np.zeros(capacity, dtype=np.int64)
+        self.y = np.zeros(capacity, dtype=np.int64)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.tick = np.zeros(capacity, dtype=np.int64)
+        self.realtor_id = np.full(capacity, NO_REALTOR, dtype=np.int64)
+
+    def _grow(self):
+        slots = self._slots()
+        held = {name: getattr(self, name)[slots] for name in COLUMNS}
+        self._allocate(self._capacity * 2)
+        # rows keep their row numbers, so they move to their slot in the bigger buffer.
+        slots = self._slots()
+        for name in COLUMNS:
+            getattr(self, name)[slots] = held[name]
+
+    def _slots(self):
+        return np.arange(self._head, self._tail) % self._capacity
+
+    def slot_of(self, row):
+        return row % self._capacity
+
+    def _changed(self, realtor_id):
+        self._realtor_views.pop(realtor_id, None)
+
+    def file(self, house, selling_price, date, realtor_id):
+        if len(self) == self._capacity:
+            self._grow()
+
+        row = self._tail
+        slot = self.slot_of(row)
+        self.house_id[slot] = house.unique_id
+        self.x[slot], self.y[slot] = house.pos
+        self.price[slot] = selling_price
+        self.tick[slot] = date
+        self.realtor_id[slot] = realtor_id
+        rows = self._held_rows(house.unique_id)
+        if rows == None:
+            rows = self._house_rows[house.unique_id] = deque()
+        rows.append(row)
+        # sales are filed in tick order, so a new tick starts a new bucket.
+        if len(self._ticks) == 0 or self._ticks[-1][0] != date:
+            self._ticks.append([date, row])
+        if realtor_id != NO_REALTOR:
+            filed = self._realtor_rows.get(realtor_id)
+            if filed == None:
+                filed = self._realtor_rows[realtor_id] = deque()
+            filed.append(row)
+            self._changed(realtor_id)
+        self._tail += 1
+        return row
+
+    def is_live(self, row):
+        return self._head <= row < self._tail
+
+    def unfile_row(self, row):
+        if self.is_live(row):
+            self._unfile(row)
+
+    def _unfile(self, row):
+        # the row stays in the realtor's rows until it expires, but leaves its view.
+        slot = self.slot_of(row)
+        filed_with = self.realtor_id.item(slot)
+        if filed_with != NO_REALTOR:
+            self.realtor_id[slot] = NO_REALTOR
+            self._changed(filed_with)
+
+    def _held_rows(self, house_id):
+        # the rows of a house which have expired are only dropped when next looked at.
+        rows = self._house_rows.get(house_id)
+        if rows == None:
+            return None
+        while len(rows) > 0 and rows[0] < self._head:
+            rows.popleft()
+        return rows
+
+    def unfile_house(self, house_id, realtor_id=None):
+        for row in self._held_rows(house_id) or ():
+            if realtor_id == None or self.realtor_id[self.slot_of(row)] == realtor_id:
+                self._unfile(row)
+        if realtor_id == None:
+            # every record of the house is unfiled: it has been demolished.
+            self._house_rows.pop(house_id, None)
+
+    def expire(self, before_tick):
+        # buckets are in tick order, so the expired buckets are the oldest ones.
+        expired = self._head
+        while len(self._ticks) > 0 and self._ticks[0][0] < before_tick:
+            self._ticks.popleft()
+            expired = self._ticks[0][1] if len(self._ticks) > 0 else self._tail
+
+        if expired != self._head:
+            self._head = expired
+            for filed_with, filed in self._realtor_rows.items():
+                if len(filed) > 0 and filed[0] < expired:
+                    while len(filed) > 0 and filed[0] < expired:
+                        filed.popleft()
+                    self._changed(filed_with)
+
+    def prices(self):
+        return self.price[self._slots()]
+
+    def realtor_rows(self, realtor_id):
+        return self._realtor_view(realtor_id)[0]
+
+    def _realtor_view(self, realtor_id):
+        # a realtor's view is cached until a row is filed, unfiled or expires on it.
+        view = self._realtor_views.get(realtor_id)
+        if view == None:
+            # rows are filed in increasing order, so these are in row order.
+            filed = self._realtor_rows.get(realtor_id, ())
+            rows = np.fromiter(filed, dtype=np.int64, count=len(filed))
+            slots = rows % self._capacity
+            # the rows unfiled since they were filed are left out.
+            still_filed = self.realtor_id[slots] == realtor_id
+            rows = rows[still_filed]
+            slots = slots[still_filed]
+            view = (rows, self.x[slots], self.y[slots], self.price[slots])
+            self._realtor_views[realtor_id] = view
+        return view
+
+    def local_prices(self, realtor_id, pos, radius):
+        rows, x, y, price = self._realtor_view(realtor_id)
+        distance = np.sqrt((x - pos[0]) ** 2 + (y - pos[1]) ** 2)
+        return price[distance < radius]
+
+    def record(self, row):
+        return Records(self, row)
+
+    def records(self, realtor_id):
+        return [Records(self, row) for row in self.realtor_rows(realtor_id).tolist()]
+
+    def get_state(self):
+        state = {name: getattr(self, name)[self._slots()] for name in COLUMNS}
+        state["head"] = np.array(self._head)
+        state["tail"] = np.array(self._tail)
+        state["capacity"] = np.array(self._capacity)
+        # the rows of each house, one after the other, with the number of each.
+        state["house_rows_id"] = np.array(list(self._house_rows), dtype=np.int64)
+        state["house_rows_count"] = np.array(
+            [len(rows) for rows in self._house_rows.values()], dtype=np.int64
+        )
+        state["house_rows"] = np.array(
+            [row for rows in self._house_rows.values() for row in rows],
+            dtype=np.int64,
+        )
+        state["ticks"] = np.array(self._ticks, dtype=np.int64).reshape(-1, 2)
+        return state
+
+    def set_state(self, state):
+        self._allocate(int(state["capacity"]))
+        self._head = int(state["head"])
+        self._tail = int(state["tail"])
+        slots = self._slots()
+        for name in COLUMNS:
+            getattr(self, name)[slots] = state[name]
+
+        self._house_rows = {}
+        rows = state["house_rows"].tolist()
+        start = 0
+        for house_id, count in zip(
+            state["house_rows_id"].tolist(), state["house_rows_count"].tolist()
+        ):
+            self._house_rows[house_id] = deque(rows[start : start + count])
+            start += count
+        self._ticks = deque(state["ticks"].tolist())
+
+        self._realtor_rows = {}
+        held = np.arange(self._head, self._tail)
+        filed_with = self.realtor_id[slots]
+        for realtor_id in np.unique(filed_with[filed_with != NO_REALTOR]).tolist():
+            self._realtor_rows[realtor_id] = deque(
+                held[filed_with == realtor_id].tolist()
+            )
+        self._realtor_views = {}
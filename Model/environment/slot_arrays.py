@@ -0,0 +1,144 @@
+"""The SlotArrays object
+Description:
+    Agent state held as NumPy arrays ("columns"), one slot per agent, rather than
+    as attributes of each agent object. An agent is given a slot when it is created
+    and its attributes are SlotField descriptors reading and writing its slot, so
+    it still looks the same to the rest of the model while the model can work on
+    the columns of all the agents at once.
+
+    The slot of an agent which leaves the model is only handed out again at the
+    end of the step (recycle()), so within a step a slot always belongs to the
+    same agent, even for lists of agents gathered earlier in the step.
+"""
+
+import numpy as np
+
+# stands for None in the integer columns.
+NONE = int(np.iinfo(np.int64).min)
+
+
+class SlotField:
+    """
+    An agent attribute held in a column of a SlotArrays.
+
+    Parameters:
+    store (str): The name of the agent attribute holding the SlotArrays.
+    column (str): The name of the column.
+    """
+
+    def __init__(self, store, column):
+        self.store = store
+        self.column = column
+
+    def __get__(self, agent, agent_type=None):
+        if agent == None:
+            return self
+        # item() gives a Python float, int or bool.
+        value = getattr(getattr(agent, self.store), self.column).item(agent.slot)
+        if value == NONE:
+            return None
+        return value
+
+    def __set__(self, agent, value):
+        if value == None:
+            value = NONE
+        getattr(getattr(agent, self.store), self.column)[agent.slot] = value
+
+
+class SlotArrays:
+    """
+    A base class holding agent state in NumPy arrays, indexed by slot.
+
+    Class attributes:
+    COLUMNS (dict): column name -> (dtype, value of a newly allocated slot).
+
+    Attributes:
+    live (numpy.ndarray): Whether a slot belongs to an agent in the model.
+
+    Methods:
+    allocate():
+        Get a free slot, with all columns set to their initial values.
+
+    release(slot):
+        Give up the slot of an agent which has left the model.
+
+    recycle():
+        Make the slots released during the step free to be allocated again.
+
+    slots_of(agents):
+        Get the slots of some agents as an array.
+
+    get_state():
+        Get the columns and the slots in use, as arrays.
+
+    set_state(state):
+        Put back the columns and slots from get_state().
+    """
+
+    COLUMNS = {}
+
+    def __init__(self, capacity=1024):
+        self._capacity = 0
+        self.live = np.zeros(0, dtype=bool)
+        for name, (dtype, initial) in self.COLUMNS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._grow(max(1, int(capacity)))
+        self._next_slot = 0
+        self._free = []
+        self._released = []
+
+    def _grow(self, capacity):
+        for name in ("live",) + tuple(self.COLUMNS):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: self._capacity] = column
+            setattr(self, name, grown)
+        self._capacity = capacity
+
+    def allocate(self):
+        if len(self._free) > 0:
+            slot = self._free.pop()
+        else:
+            if self._next_slot == self._capacity:
+                self._grow(self._capacity * 2)
+            slot = self._next_slot
+            self._next_slot += 1
+
+        for name, (dtype, initial) in self.COLUMNS.items():
+            getattr(self, name)[slot] = initial
+        self.live[slot] = True
+        return slot
+
+    def release(self, slot):
+        self.live[slot] = False
+        self._released.append(slot)
+
+    def recycle(self):
+        self._free.extend(self._released)
+        self._released = []
+
+    def slots_of(self, agents):
+        return np.fromiter(
+            (agent.slot for agent in agents), dtype=np.int64, count=len(agents)
+        )
+
+    def get_state(self):
+        # only the slots handed out so far, the rest are all zeros.
+        state = {
+            name: getattr(self, name)[: self._next_slot].copy()
+            for name in ("live",) + tuple(self.COLUMNS)
+        }
+        state["capacity"] = np.array(self._capacity)
+        state["free"] = np.array(self._free, dtype=np.int64)
+        state["released"] = np.array(self._released, dtype=np.int64)
+        return state
+
+    def set_state(self, state):
+        self._capacity = int(state["capacity"])
+        self._next_slot = len(state["live"])
+        for name in ("live",) + tuple(self.COLUMNS):
+            column = np.zeros(self._capacity, dtype=getattr(self, name).dtype)
+            column[: self._next_slot] = state[name]
+            setattr(self, name, column)
+        self._free = state["free"].tolist()
+        self._released = state["released"].tolist()
@@ -0,0 +1,37 @@
+"""The model snapshot
+Description:
+    A snapshot of a running model: the model, with all of its agents, indexes and
+    arrays, pickled together with the states of the random number generators it
+    draws from (the model's own, the global random and np.random). A model
+    restored from a snapshot, stepped on, makes exactly the same draws, and so
+    the same run, as the model the snapshot was taken of would have, so several
+    runs can be branched off one shared start (e.g. the scenarios of a study, all
+    run up to the intervention step).
+"""
+
+import pickle
+import random
+import numpy as np
+
+
+def take_snapshot(model):
+    """
+    Take a snapshot of a model, as bytes.
+    """
+    return pickle.dumps(
+        (model, model.random.getstate(), random.getstate(), np.random.get_state()),
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+
+def restore_snapshot(snapshot):
+    """
+    Get a new copy of the model a snapshot was taken of, and put the random
+    number generators back in the states they were in when it was taken.
+    """
+    model, model_random, global_random, numpy_random = pickle.loads(snapshot)
+    # the model's generator is shared by the model class (see Model.__new__).
+    model.random.setstate(model_random)
+    random.setstate(global_random)
+    np.random.set_state(numpy_random)
+    return model
@@ -0,0 +1,123 @@
+"""The SpatialIndex object
+Description:
+    A cell-bucketed spatial hash over the positions of agents on the model grid.
+    The grid is cut into square buckets of cell_size x cell_size cells so that the
+    "which houses (or records) are within Locality of (x, y)" queries used by the
+    realtors' valuations only look at the handful of buckets around (x, y) instead
+    of at every agent in the model.
+
+    within() measures straight line (euclidean) distance on the plane, exactly like
+    calc_distance() in the model and the realtors.
+"""
+
+from math import floor, sqrt
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    A class indexing items (agents) by their (x, y) position on the grid.
+
+    Parameters:
+    width (int): Width of the grid.
+    height (int): Height of the grid.
+    cell_size (int): Width and height, in grid cells, of each bucket.
+
+    Methods:
+    insert(item, pos):
+        Add an item at a position, or move it there if it is already indexed.
+
+    remove(item):
+        Remove an item from the index, if it is indexed.
+
+    within(pos, radius, inclusive=False):
+        Get the items whose euclidean distance to pos is less than (or, if
+        inclusive, no more than) radius.
+
+    position_of(item):
+        Get the position at which an item is indexed.
+
+    get_state():
+        Get the unique_ids and positions of the items, in the order indexed.
+
+    set_state(state, agents):
+        Index the items of get_state() again, given the agents by unique_id.
+    """
+
+    def __init__(self, width, height, cell_size=1):
+        self.width = width
+        self.height = height
+        self.cell_size = max(1, int(cell_size))
+        self._buckets = {}
+        self._positions = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def insert(self, item, pos):
+        if item in self._positions:
+            self.remove(item)
+
+        self._positions[item] = pos
+        self._buckets.setdefault(self._bucket_of(pos), {})[item] = pos
+
+    def remove(self, item):
+        pos = self._positions.pop(item, None)
+        if pos == None:
+            return
+
+        key = self._bucket_of(pos)
+        bucket = self._buckets[key]
+        del bucket[item]
+        if len(bucket) == 0:
+            del self._buckets[key]
+
+    def position_of(self, item):
+        return self._positions.get(item)
+
+    def get_state(self):
+        return {
+            "id": np.array(
+                [item.unique_id for item in self._positions], dtype=np.int64
+            ),
+            "pos": np.array(list(self._positions.values()), dtype=np.int64).reshape(
+                -1, 2
+            ),
+        }
+
+    def set_state(self, state, agents):
+        self._buckets = {}
+        self._positions = {}
+        # inserted in the same order, every bucket holds its items in the same order.
+        for unique_id, pos in zip(state["id"].tolist(), state["pos"].tolist()):
+            self.insert(agents[unique_id], tuple(pos))
+
+    def within(self, pos, radius, inclusive=False):
+        x, y = pos
+        found = []
+        last_x = (self.width - 1) // self.cell_size
+        last_y = (self.height - 1) // self.cell_size
+
+        for bx in range(
+            max(0, floor((x - radius) / self.cell_size)),
+            min(last_x, floor((x + radius) / self.cell_size)) + 1,
+        ):
+            for by in range(
+                max(0, floor((y - radius) / self.cell_size)),
+                min(last_y, floor((y + radius) / self.cell_size)) + 1,
+            ):
+                bucket = self._buckets.get((bx, by))
+                if bucket == None:
+                    continue
+                for item, item_pos in bucket.items():
+                    distance = sqrt((x - item_pos[0]) ** 2 + (y - item_pos[1]) ** 2)
+                    if distance < radius or (inclusive and distance == radius):
+                        found.append(item)
+
+        return found
+
+    def _bucket_of(self, pos):
+        return (pos[0] // self.cell_size, pos[1] // self.cell_size)
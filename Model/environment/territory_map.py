@@ -0,0 +1,79 @@
+"""The TerritoryMap object
+Description:
+    The local realtors of every cell of the grid. A house's local realtors are the
+    realtors within RealtorTerritory - 1 cells of it (its Moore neighbourhood on the
+    torus), or, if there are none, the realtor nearest to it. Realtors do not move
+    during a run, so rather than searching the neighbourhood of every house that
+    is built, the distances from every realtor to every row and column of the grid
+    are worked out once and the local realtors of a cell are then looked up, and
+    remembered, the first time a house is built on it.
+
+    The local realtors are given in the order MultiGrid.get_neighbors() returns
+    them, by position and then in the order they were placed on the grid.
+"""
+
+from math import sqrt
+import numpy as np
+
+
+class TerritoryMap:
+    """
+    A class mapping each cell of the grid to the realtors whose territory it is in.
+
+    Parameters:
+    width (int): Width of the grid.
+    height (int): Height of the grid.
+    realtors (list): The realtors, in the order they were placed on the grid.
+    radius (int): The territory of a realtor, in cells, RealtorTerritory - 1.
+
+    Methods:
+    local_realtors(pos):
+        Get the realtors whose territory covers pos or, if there are none, the
+        realtor nearest to pos.
+
+    nearest_realtor(pos):
+        Get the realtor at the shortest (whole number) straight line distance to pos.
+    """
+
+    def __init__(self, width, height, realtors, radius):
+        self.width = width
+        self.height = height
+        self.realtors = list(realtors)
+        # on a small torus the neighbourhood wraps round onto the centre cell.
+        self.include_centre = radius >= width or radius >= height
+
+        # sorted() is stable, so realtors sharing a cell stay in placement order.
+        self._by_position = sorted(self.realtors, key=lambda realtor: realtor.pos)
+        xs = np.array([realtor.pos[0] for realtor in self._by_position], dtype=int)
+        ys = np.array([realtor.pos[1] for realtor in self._by_position], dtype=int)
+        dx = np.abs(np.arange(width)[None, :] - xs[:, None])
+        dy = np.abs(np.arange(height)[None, :] - ys[:, None])
+        # realtor -> columns (rows) within radius of it, going either way round.
+        self._near_x = np.minimum(dx, width - dx) <= radius
+        self._near_y = np.minimum(dy, height - dy) <= radius
+
+        self._cells = {}
+
+    def local_realtors(self, pos):
+        local = self._cells.get(pos)
+        if local == None:
+            x, y = pos
+            local = [
+                realtor
+                for i, realtor in enumerate(self._by_position)
+                if self._near_x[i, x]
+                and self._near_y[i, y]
+                and (self.include_centre or realtor.pos != pos)
+            ]
+            if len(local) == 0:
+                local = [self.nearest_realtor(pos)]
+            self._cells[pos] = local
+        return list(local)
+
+    def nearest_realtor(self, pos):
+        # the first realtor placed at the shortest whole number distance.
+        distances = [
+            int(sqrt((pos[0] - realtor.pos[0]) ** 2 + (pos[1] - realtor.pos[1]) ** 2))
+            for realtor in self.realtors
+        ]
+        return self.realtors[distances.index(min(distances))]
@@ -0,0 +1,83 @@
+"""The ValuationCache object
+Description:
+    Remembers, for the rest of a tick, the valuations the realtors give the houses
+    newly put on the market and the local medians those valuations are based on.
+    A new house is valued by each of its local realtors to choose its realtor, and
+    then again by the chosen realtor to set its price; with the cache the second
+    valuation is the first one, looked up.
+
+    A valuation is based on either the median price of the realtor's sales near
+    the house, which only changes when the realtor's records do (they do not
+    while the new houses are being valued), so it is kept by (realtor, cell), or
+    on the median price of the houses near the realtor, which is kept by realtor
+    and forgotten whenever a house within Locality of the realtor is given a new
+    price. The model clears the cache at the start and at the end of every step,
+    whether or not anything has been valued, so nothing is carried over from one
+    tick to the next.
+"""
+
+from math import sqrt
+
+
+class ValuationCache:
+    """
+    A class remembering the realtors' valuations of the houses during a tick.
+
+    Parameters:
+    locality (float): Locality, the radius of the houses near a realtor.
+
+    Methods:
+    clear():
+        Forget everything, the records or the prices may have changed.
+
+    valuation(realtor, house, value):
+        Get realtor's valuation of house, value() working it out the first time.
+
+    local_sales_median(realtor, pos, median):
+        Get the median of realtor's sales near pos, median() working it out the
+        first time (None if there are no such sales).
+
+    local_houses_median(realtor, median):
+        Get the median price of the houses near realtor, median() working it out
+        the first time (None if there are no such houses).
+
+    repriced(house):
+        Forget the valuations of house and the medians its price is part of.
+    """
+
+    def __init__(self, locality):
+        self.locality = locality
+        self.clear()
+
+    def clear(self):
+        self._valuations = {}
+        self._sales_medians = {}
+        self._houses_medians = {}
+
+    def valuation(self, realtor, house, value):
+        key = (realtor, house)
+        if key not in self._valuations:
+            self._valuations[key] = value()
+        return self._valuations[key]
+
+    def local_sales_median(self, realtor, pos, median):
+        key = (realtor, pos)
+        if key not in self._sales_medians:
+            self._sales_medians[key] = median()
+        return self._sales_medians[key]
+
+    def local_houses_median(self, realtor, median):
+        if realtor not in self._houses_medians:
+            self._houses_medians[realtor] = median()
+        return self._houses_medians[realtor]
+
+    def repriced(self, house):
+        for realtor in house.get_list_of_local_realtors():
+            self._valuations.pop((realtor, house), None)
+
+        # the houses near a realtor are those within Locality of it, inclusive.
+        x, y = house.pos
+        for realtor in list(self._houses_medians):
+            distance = sqrt((realtor.pos[0] - x) ** 2 + (realtor.pos[1] - y) ** 2)
+            if distance <= self.locality:
+                del self._houses_medians[realtor]
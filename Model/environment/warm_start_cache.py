@@ -0,0 +1,220 @@
+"""The WarmStartCache object
+Description:
+    An on-disk cache of set up (and, optionally, burned in) models. Setting up a
+    model (placing the houses, creating the owners, imputing the prices, the
+    quality indexes and the initial records) and running it through its first
+    ticks gives the same model every time for the same parameters and seed, so
+    rather than doing it again for every run of an experiment the model is
+    written to the cache the first time, as a checkpoint (see checkpoint.py), and
+    restored from it after that. A run started from the cache is the same as a run
+    started from scratch.
+
+    Each cached model is a file named by a stable hash of the model's parameters,
+    its seed and the number of ticks it has been burned in for. The parameters are
+    first cast to the types of their values in input_params.py, where that keeps
+    their value, so that InterestRate=7 and InterestRate=7.0 name the same model,
+    and the model is set up with the parameters cast. Only the parameters the
+    model depends on are hashed: the scenario and intervention step are left out
+    while the intervention is still to come, as the model is the same until it
+    happens, and so are vectorised_owners and bulk_setup, which only change how
+    the model is worked out; they are set on the model restored. The cache is held to a size: when it grows past it the models used
+    least recently are removed. Several processes can share a cache directory.
+
+    Example, the model with the parameters of input_params.py, on a 61 x 61 grid,
+    seed 1, burned in for 50 ticks:
+        cache = WarmStartCache("model_cache")
+        model = cache.model(parameters, seed=1, burn_in=50)
+"""
+
+from environment.mesa_model import MesaModel
+from environment.checkpoint import save_checkpoint, load_checkpoint, VERSION
+from input_params import InputParameters
+import hashlib
+import inspect
+import json
+import os
+
+# the parameters which do not change the model, only how it is worked out.
+METHOD_PARAMETERS = ("vectorised_owners", "bulk_setup")
+
+
+def parameter_types():
+    # the type of each MesaModel argument, as in input_params.py.
+    input_par = InputParameters()
+    types = {"width": int, "height": int}
+    for name, argument in inspect.signature(MesaModel.__init__).parameters.items():
+        if hasattr(input_par, name):
+            types[name] = type(getattr(input_par, name))
+        elif argument.default != inspect.Parameter.empty:
+            types[name] = type(argument.default)
+    return types
+
+
+def normalise(parameters):
+    # numbers cast to the type of the parameter, where that keeps their value.
+    types = parameter_types()
+    normalised = {}
+    for name, value in parameters.items():
+        kind = types.get(name)
+        if (
+            kind in (int, float)
+            and isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and kind(value) == value
+        ):
+            value = kind(value)
+        normalised[name] = value
+    return normalised
+
+
+class WarmStartCache:
+    """
+    A class caching set up and burned in models on disk.
+
+    Parameters:
+    directory (str): The directory the models are kept in, made if need be.
+    max_bytes (int): The size the cache is held to.
+    compressed (bool): Whether the models are written compressed (smaller, slower).
+
+    Methods:
+    key(parameters, seed, burn_in=0):
+        Get the name of the cached model with parameters and seed, run burn_in ticks;
+        equal parameters give the same name whatever their types.
+
+    get(key):
+        Get a new copy of a cached model, or None if it is not cached.
+
+    put(key, model):
+        Cache a model, removing the least recently used other models if need be;
+        a model larger than the whole cache is not cached.
+
+    model(parameters, seed, burn_in=0):
+        Get the model with parameters and seed, run burn_in ticks, from the cache
+        if it is there, or set it up, run it and cache it if not.
+
+    clear():
+        Remove every cached model.
+    """
+
+    SUFFIX = ".npz"
+
+    def __init__(self, directory, max_bytes=1 << 30, compressed=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compressed = compressed
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, parameters, seed, burn_in=0):
+        parameters = normalise(parameters)
+        # the model is the same, whatever the scenario, until the intervention.
+        intervention_step = int(parameters.get("intervention_step", 0))
+        if not 0 < intervention_step <= burn_in:
+            parameters.pop("scenario", None)
+            parameters.pop("intervention_step", None)
+        for name in METHOD_PARAMETERS:
+            parameters.pop(name, None)
+        text = json.dumps(
+            {
+                "parameters": parameters,
+                "seed": int(seed),
+                "burn_in": int(burn_in),
+                "version": VERSION,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            # the time of last use, for the least recently used to go first.
+            os.utime(path)
+            return load_checkpoint(path)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, model):
+        # written under a name of its own and then renamed, so that another
+        # process never reads a half written model.
+        path = self._path(key)
+        temporary = path + ".%d.tmp" % os.getpid()
+        with open(temporary, "wb") as file:
+            save_checkpoint(model, file, self.compressed)
+        size = os.path.getsize(temporary)
+        if size > self.max_bytes:
+            os.remove(temporary)
+            return
+        os.replace(temporary, path)
+        self._evict(keep=path, kept_size=size)
+
+    def _evict(self, keep=None, kept_size=0):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            # the model just cached counts towards the size, but stays.
+            if path == keep:
+                continue
+            try:
+                status = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+
+        total = kept_size + sum(size for last_used, size, path in entries)
+        for last_used, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def model(self, parameters, seed, burn_in=0):
+        """
+        Get a model from the cache, or make it and cache it.
+
+        Parameters:
+        parameters (dict): The MesaModel arguments, other than seed.
+        seed (int): The seed of the run; models without one are not cached.
+        burn_in (int): The number of ticks the model is run for.
+
+        Returns:
+        MesaModel: The model, with the random number generators as they would be
+        had it just been set up and run.
+        """
+        if seed == None:
+            model = MesaModel(**parameters)
+            self._burn_in(model, burn_in)
+            return model
+
+        parameters = normalise(parameters)
+        key = self.key(parameters, seed, burn_in)
+        model = self.get(key)
+        if model == None:
+            model = MesaModel(**parameters, seed=seed)
+            self._burn_in(model, burn_in)
+            self.put(key, model)
+        # left out of the key, see key().
+        for name in ("scenario", "intervention_step") + METHOD_PARAMETERS:
+            if name in parameters:
+                setattr(model, name, parameters[name])
+        return model
+
+    @staticmethod
+    def _burn_in(model, burn_in):
+        while model.current_step < burn_in and model.running:
+            model.step()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
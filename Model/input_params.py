@@ -38,3 +38,4 @@ class InputParameters:
         self.MortgageDuration = 25
         self.StampDuty = True  # bool
         self.scenario = "none"
+        self.intervention_step = 0  # tick of the scenario's intervention
@@ -53,6 +53,7 @@ model = MesaModel(
     input_par.MortgageDuration,
     input_par.StampDuty,
     input_par.scenario,
+    input_par.intervention_step,
 )
 
 
@@ -60,5 +61,9 @@ model = MesaModel(
 for i in range(60):
     model.step()
 
+# the run stops early if no people or no houses are left.
+if not model.running:
+    print("Finished: " + model.termination_reason + "!")
+
 
 # get_distribution_of_earnings_plot(100, 1)
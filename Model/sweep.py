@@ -0,0 +1,358 @@
+from environment.mesa_model import MesaModel
+from environment.snapshot import take_snapshot, restore_snapshot
+from environment.warm_start_cache import WarmStartCache
+from input_params import InputParameters
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+import numpy as np
+import pandas as pd
+import argparse
+import inspect
+
+"""
+Description:
+    Runs the model headless over a grid of parameter values, each combination
+    repeated a number of times, with the runs shared out between worker processes.
+    The DataCollector results of each run are written to a single CSV table as
+    soon as the run finishes, one row per run and step, with the run's number,
+    replicate, seed and swept parameter values alongside the model reporters, and
+    why and when the run stopped if it stopped early (it then costs only the
+    steps it ran). A run which fails is written as a single row, with its
+    parameter values, seed and the error as its termination reason, once the
+    other runs have finished.
+
+    Parameters not swept take their values from InputParameters (and a 61 x 61
+    grid, as in main.py). Each run has its own seed, drawn from the seed of the
+    sweep, so a sweep can be repeated exactly; the runs of the different scenarios
+    of the same parameter values and replicate share a seed.
+
+    The scenarios only differ from the intervention step on, so when scenario is
+    swept the steps before it are run once, for each set of parameter values and
+    replicate, and every scenario is then branched off a snapshot of the model
+    taken just before the intervention. A branched run is the same as a run of
+    the scenario from the start.
+
+    With a cache directory, each run starts from the model set up (and burned in
+    for a number of ticks) with its parameters and seed, taken from the cache if
+    an earlier sweep has put it there (see warm_start_cache.py), so repeating an
+    experiment does not set up and burn in its models again.
+
+    Example, two interest rates by two scenarios, five replicates each, on four
+    cores:
+        python sweep.py --param InterestRate=5,7 --param scenario=none,ratefall
+            --param intervention_step=100 --replicates 5 --workers 4 --steps 200
+"""
+
+# Size of GRID environment, unless swept.
+GRID_SIZE_X = 61
+GRID_SIZE_Y = 61
+
+
+def default_parameters():
+    # the MesaModel arguments, with their values from InputParameters.
+    input_par = InputParameters()
+    arguments = inspect.signature(MesaModel.__init__).parameters
+    parameters = {
+        name: getattr(input_par, name) for name in arguments if hasattr(input_par, name)
+    }
+    parameters["width"] = GRID_SIZE_X
+    parameters["height"] = GRID_SIZE_Y
+    return parameters
+
+
+def expand_grid(parameter_grid):
+    # every combination of the values of the swept parameters.
+    names = list(parameter_grid)
+    return [
+        dict(zip(names, values))
+        for values in product(*(parameter_grid[name] for name in names))
+    ]
+
+
+def start_model(parameters, seed, cache=None, burn_in=0):
+    # the model set up, and burned in, from the cache if there is one.
+    if cache == None:
+        return MesaModel(**parameters, seed=seed)
+    return cache.model(parameters, seed, burn_in)
+
+
+def run_model(run, replicate, parameters, swept, steps, seed, cache=None, burn_in=0):
+    model = start_model(parameters, seed, cache, min(burn_in, steps))
+    run_steps(model, steps)
+    return [tabulate(model, run, replicate, parameters, swept, seed)]
+
+
+def run_scenarios(
+    run, replicate, parameters, swept, scenarios, steps, seed, cache=None, burn_in=0
+):
+    # the steps before the intervention are the same in every scenario.
+    shared_steps = min(int(parameters["intervention_step"]) - 1, steps)
+    model = start_model(
+        dict(parameters, scenario=scenarios[0]),
+        seed,
+        cache,
+        max(0, min(burn_in, shared_steps)),
+    )
+    run_steps(model, shared_steps)
+    snapshot = take_snapshot(model)
+
+    results = []
+    for branch, scenario in enumerate(scenarios):
+        model = restore_snapshot(snapshot)
+        model.scenario = scenario
+        run_steps(model, steps)
+        results.append(
+            tabulate(
+                model,
+                run + branch,
+                replicate,
+                dict(parameters, scenario=scenario),
+                swept,
+                seed,
+            )
+        )
+    return results
+
+
+def run_steps(model, steps):
+    # step the model on until it has run steps steps in all.
+    while model.current_step < steps:
+        # a run which has stopped early (no owners or houses left) is not stepped on.
+        if not model.running:
+            break
+        model.step()
+
+
+def tabulate(model, run, replicate, parameters, swept, seed):
+    results = model.datacollector.get_model_vars_dataframe()
+    results.insert(0, "Step", results.index)
+    for position, (name, value) in enumerate(
+        [("Run", run), ("Replicate", replicate), ("Seed", seed)]
+        + [(name, parameters[name]) for name in swept]
+    ):
+        results.insert(position, name, value)
+    results["Termination reason"] = model.termination_reason
+    results["Termination step"] = model.termination_step
+    return results
+
+
+def tabulate_failure(run, replicate, parameters, swept, seed, error):
+    # a single row for a run which raised an error, in place of its results.
+    row = {"Run": run, "Replicate": replicate, "Seed": seed}
+    row.update((name, parameters[name]) for name in swept)
+    row["Termination reason"] = "error: %s: %s" % (type(error).__name__, error)
+    row["Termination step"] = None
+    return pd.DataFrame([row])
+
+
+def sweep(
+    parameter_grid,
+    replicates=1,
+    workers=None,
+    steps=60,
+    output="sweep_results.csv",
+    seed=0,
+    fixed=None,
+    branch_scenarios=True,
+    cache_dir=None,
+    cache_bytes=1 << 30,
+    burn_in=0,
+):
+    """
+    Run the model for every combination of the values in parameter_grid.
+
+    Parameters:
+    parameter_grid (dict): MesaModel argument -> list of values to sweep over.
+    replicates (int): Number of runs of each combination, with different seeds.
+    workers (int): Number of worker processes, by default one per core.
+    steps (int): Number of steps of each run.
+    output (str): Path of the CSV file the results are written to.
+    seed (int): Seed of the sweep, from which the seed of each run is drawn.
+    fixed (dict): MesaModel argument -> value, for parameters not swept that
+        should not take their InputParameters value.
+    branch_scenarios (bool): Whether the scenarios swept are branched off a
+        shared run up to the intervention step, or each run from the start.
+    cache_dir (str): Directory of a cache of set up models to start the runs
+        from, or None to set up every model from scratch.
+    cache_bytes (int): The size the cache is held to.
+    burn_in (int): Number of steps the models cached are run for.
+
+    Returns:
+    int: The number of runs written to output, those which failed included.
+    """
+    base = default_parameters()
+    base.update(fixed or {})
+    swept = list(parameter_grid)
+    scenarios = parameter_grid.get("scenario", [base["scenario"]])
+    others = dict(parameter_grid)
+    others.pop("scenario", None)
+
+    # the scenarios of each set of values and replicate share a seed.
+    groups = []
+    for combination in expand_grid(others):
+        for replicate in range(replicates):
+            groups.append((replicate, dict(base, **combination)))
+    seeds = np.random.SeedSequence(seed).generate_state(len(groups)).tolist()
+    cache = None if cache_dir == None else WarmStartCache(cache_dir, cache_bytes)
+
+    written = 0
+    columns = []
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # future -> the (run, replicate, parameters, seed) of the runs it makes.
+        futures = {}
+        for group, (replicate, parameters) in enumerate(groups):
+            run = group * len(scenarios)
+            if branch_scenarios and len(scenarios) > 1:
+                future = executor.submit(
+                    run_scenarios,
+                    run,
+                    replicate,
+                    parameters,
+                    swept,
+                    scenarios,
+                    steps,
+                    seeds[group],
+                    cache,
+                    burn_in,
+                )
+                futures[future] = [
+                    (
+                        run + branch,
+                        replicate,
+                        dict(parameters, scenario=scenario),
+                        seeds[group],
+                    )
+                    for branch, scenario in enumerate(scenarios)
+                ]
+                continue
+            for branch, scenario in enumerate(scenarios):
+                future = executor.submit(
+                    run_model,
+                    run + branch,
+                    replicate,
+                    dict(parameters, scenario=scenario),
+                    swept,
+                    steps,
+                    seeds[group],
+                    cache,
+                    burn_in,
+                )
+                futures[future] = [
+                    (
+                        run + branch,
+                        replicate,
+                        dict(parameters, scenario=scenario),
+                        seeds[group],
+                    )
+                ]
+
+        # the results are written in the order the runs finish.
+        for future in as_completed(futures):
+            try:
+                runs = future.result()
+            except Exception as error:
+                # the other runs carry on, the failed ones are written at the end.
+                for run, replicate, parameters, run_seed in futures[future]:
+                    failures.append(
+                        tabulate_failure(
+                            run, replicate, parameters, swept, run_seed, error
+                        )
+                    )
+                continue
+            for results in runs:
+                results.to_csv(
+                    output,
+                    mode="w" if written == 0 else "a",
+                    header=written == 0,
+                    index=False,
+                )
+                columns = results.columns
+                written += 1
+
+    # the failed runs take the columns of the runs written, with no results.
+    for results in failures:
+        if len(columns) > 0:
+            results = results.reindex(columns=columns)
+        results.to_csv(
+            output,
+            mode="w" if written == 0 else "a",
+            header=written == 0,
+            index=False,
+        )
+        columns = results.columns
+        written += 1
+    return written
+
+
+def parse_values(text):
+    # "a,b,c" -> values, as numbers or booleans where they look like them.
+    values = []
+    for value in text.split(","):
+        if value in ("True", "False"):
+            values.append(value == "True")
+            continue
+        for convert in (int, float):
+            try:
+                values.append(convert(value))
+                break
+            except ValueError:
+                pass
+        else:
+            values.append(value)
+    return values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of the model.")
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        metavar="NAME=V1,V2,...",
+        help="a MesaModel argument and the values to sweep it over",
+    )
+    parser.add_argument("--replicates", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="sweep_results.csv")
+    parser.add_argument(
+        "--no-branching",
+        action="store_true",
+        help="run every scenario from the start rather than branching them",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory of a cache of set up models to start the runs from",
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=1024, help="size of the cache in MB"
+    )
+    parser.add_argument(
+        "--burn-in",
+        type=int,
+        default=0,
+        help="number of steps the models cached are run for",
+    )
+    args = parser.parse_args()
+
+    parameter_grid = {}
+    for param in args.param:
+        name, values = param.split("=", 1)
+        parameter_grid[name] = parse_values(values)
+
+    n_runs = sweep(
+        parameter_grid,
+        replicates=args.replicates,
+        workers=args.workers,
+        steps=args.steps,
+        output=args.output,
+        seed=args.seed,
+        branch_scenarios=not args.no_branching,
+        cache_dir=args.cache_dir,
+        cache_bytes=args.cache_size * 1024 * 1024,
+        burn_in=args.burn_in,
+    )
+    print("Finished: %d runs written to %s" % (n_runs, args.output))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the model's modules are imported from the Model directory, as main.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+from environment.mesa_model import MesaModel
+from sweep import default_parameters, run_steps
+
+
+def collapsing_model(seed):
+    # houses fall down within a few ticks and none are built to replace them.
+    parameters = default_parameters()
+    parameters.update(
+        width=15, height=15, HouseMeanLifetime=0.3, HouseConstructionRate=0
+    )
+    return MesaModel(**parameters, seed=seed)
+
+
+def test_collapsing_run_stops_with_a_reason():
+    for seed in range(5):
+        model = collapsing_model(seed)
+        run_steps(model, 200)
+        assert model.running == False
+        assert model.termination_reason in (
+            "no remaining houses",
+            "no remaining people",
+        )
+        assert model.termination_step == model.current_step
+        assert model.current_step < 200
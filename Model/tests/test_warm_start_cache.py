@@ -0,0 +1,38 @@
+from environment.warm_start_cache import WarmStartCache
+from sweep import default_parameters
+
+
+def small_parameters(**changes):
+    parameters = default_parameters()
+    parameters.update(width=9, height=9)
+    parameters.update(changes)
+    return parameters
+
+
+def test_equal_parameters_of_another_type_hit_the_cache(tmp_path):
+    cache = WarmStartCache(str(tmp_path))
+    first = small_parameters(InterestRate=7, Locality=3)
+    second = small_parameters(InterestRate=7.0, Locality=3.0)
+    assert cache.key(first, 1, 2) == cache.key(second, 1, 2)
+
+    model = cache.model(first, 1, 2)
+    assert cache.get(cache.key(second, 1, 2)) != None
+    cached = cache.model(second, 1, 2)
+    assert cached.InterestRate == model.InterestRate
+    assert type(cached.Locality) == int
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_method_parameters_are_left_out_of_the_key(tmp_path):
+    cache = WarmStartCache(str(tmp_path))
+    first = small_parameters(vectorised_owners=True)
+    second = small_parameters(vectorised_owners=False)
+    assert cache.key(first, 1) == cache.key(second, 1)
+    assert cache.model(second, 1).vectorised_owners == False
+
+
+def test_different_parameters_miss_the_cache(tmp_path):
+    cache = WarmStartCache(str(tmp_path))
+    assert cache.key(small_parameters(InterestRate=7), 1) != cache.key(
+        small_parameters(InterestRate=7.5), 1
+    )